@@ -1,46 +1,107 @@
+# 모듈별 import 시간 측정 (IMPORT_PROFILE=1), 다른 import보다 먼저 실행
+import import_profile
+import_profile.install()
+
 import os
-from supabase import create_client, Client
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import traceback
 import uuid
-import subprocess
-import fitz  # PyMuPDF (코드 최상단에 추가 권장)
+import json
+import base64
+import time
 from werkzeug.utils import secure_filename
-import gc
 import logging
-from summarize import summarization, understand
-import google.generativeai as genai
+from jobs import JobManager, BatchCollector, DEFERRED, FAILED, SKIPPED, SUCCESS
+from translator import translation_pool, remove_output_dir
+from translation_memory import TranslationMemory
+from memory_guard import admission, MemoryBudgetExceeded
+from translation_batches import (
+    translate_progressively, parse_page_ranges, validate_page_ranges, batch_urls, TranslationInProgress,
+    is_translating, wait_for_translation, TRANSLATE_WAIT_TIMEOUT,
+    storage_paths as translation_storage_paths
+)
+from pdf_extract import iter_pages, page_count
+from retrieval import build_index, save_index, load_index, index_path
+from page_store import PageReader, save_pages, storage_paths, MAX_PAGES_PER_REQUEST
+from auth_cache import TokenVerifier
+from ingest import IngestRequest, UploadTooLarge, UPLOAD_MAX_BYTES
+import ingest
+from dedup import content_key, find_processed, find_processed_many, clone_record, clone_row
+from gemini_client import resolve_chat_model_name, generate, generate_stream
+import metrics
+from metrics import supabase_call
+from clients import supabase
+from cache import record_cache, invalidate_document, all_stats as cache_stats
+from reaper import StorageReaper
 
 
 app = Flask(__name__)
-CORS(app)
+# 업로드 파일을 임시 파일로 저장했다 다시 읽지 않고 스트리밍으로 받음
+app.request_class = IngestRequest
+# multipart 헤더 여유분을 더한 요청 최대 크기 (초과 시 413)
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES + 1024 * 1024
+CORS(app, expose_headers=['X-Next-Cursor', 'Server-Timing'])
 
 load_dotenv()  # env파일에서 환경변수 로드
 
 url: str = os.environ.get("SUPABASE_URL")
-# key: str = os.environ.get("SUPABASE_KEY")
-key: str = os.environ.get("SUPABASE_SERVICE_KEY")
 
 STORAGE_BUCKET = "files"  # Supabase Storage에 생성한 버킷 이름
 
-supabase: Client = create_client(url, key)
+# Supabase 클라이언트는 프로세스당 하나, 처음 사용할 때 생성 (clients.get_supabase)
 
 # 임시 파일 저장을 위한 안전한 디렉터리 설정
 TEMP_DIR = os.path.join(os.getcwd(), 'temp_pdfs')
 os.makedirs(TEMP_DIR, exist_ok=True)  # 디렉터리가 없으면 생성
+ingest.SPOOL_DIR = TEMP_DIR  # 큰 업로드가 디스크로 넘어갈 위치
 
-try:
-    supabase: Client = create_client(url, key)
-except Exception as e:
-    print(f"Supabase 클라이언트 초기화 오류: {e}")
-    supabase = None
+# 저장된 페이지 텍스트를 필요한 구간만 읽어오는 도구
+page_reader = PageReader(supabase, STORAGE_BUCKET)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 업로드 처리용 백그라운드 작업 풀 (동시 실행 수는 MAX_CONCURRENT_JOBS)
+job_manager = JobManager()
+
+# 통계 조회용 번역 메모리 (번역 워커들과 같은 DB 파일, 연결은 스레드마다 한 번만 엶)
+translation_memory = TranslationMemory()
+
+# 텍스트 추출 백엔드 (pymupdf 또는 pypdf)
+EXTRACT_BACKEND = os.environ.get("EXTRACT_BACKEND", "pymupdf")
+
+# 요약/설명을 요청 한 번으로 받을지 여부 (기본은 두 요청 동시 실행)
+SUMMARY_COMBINED = os.environ.get("SUMMARY_COMBINED") == "1"
+
+# 번역 설정 (pdf2zh 워커에 그대로 전달, 중복 판별 키에도 포함)
+TRANSLATE_LANG_IN = "en"
+TRANSLATE_LANG_OUT = "ko"
+TRANSLATE_PROMPT = "전문 용어 제외하고 한국어로 번역. 코드나 논문 제목은 원문 유지."
+
+# 서버 시작 시 번역 워커를 미리 띄워 첫 요청의 모델 로딩 시간을 없앰
+# (spawn된 자식 프로세스가 이 모듈을 다시 import할 때는 실행하지 않음)
+if os.environ.get("TRANSLATE_PREWARM") == "1" and __name__ != '__mp_main__':
+    translation_pool.warm_up()
+
+
+# SERVER_TIMING=1 이면 요청 처리 중 기록된 구간을 Server-Timing 헤더로 내려줌
+@app.before_request
+def _start_timing():
+    if metrics.SERVER_TIMING_ENABLED:
+        metrics.start_request()
+
+
+@app.after_request
+def _add_server_timing(response):
+    if metrics.SERVER_TIMING_ENABLED:
+        header = metrics.server_timing_header()
+        if header:
+            response.headers['Server-Timing'] = header
+    return response
+
 
 @app.route('/')
 def home():
@@ -126,6 +187,8 @@ def login():
 # 토큰 인증 레코레이터
 from functools import wraps
 
+token_verifier = TokenVerifier(supabase, url, os.environ.get("SUPABASE_JWT_SECRET"))
+
 
 def require_auth(f):
     @wraps(f)
@@ -135,16 +198,17 @@ def require_auth(f):
             if not token:
                 return jsonify({'error': '토큰이 없습니다.'}), 401
             if token.startswith('Bearer'):
-                token = token.split('')[1]
+                token = token.split(' ')[1]
 
-            user = supabase.auth.get_user(token)
-            if not user.user:
+            # 로컬 서명 검증 + 만료 시각까지 캐시 (모르는 키일 때만 원격 확인)
+            claims = token_verifier.verify(token)
+            if not claims:
                 return jsonify({"error": "유효하지 않은 토큰"}), 401
-            request.user = user.user
-            return f(*args, **kwargs)
+            request.user = claims  # claims['sub'] 가 user id
         except Exception as e:
             return jsonify({'error': f'토큰 검증 실패: {str(e)}'}), 401
-        return wrapper
+        return f(*args, **kwargs)
+    return wrapper
 
 
 
@@ -156,238 +220,662 @@ def clean_text_for_db(text):
     return text.replace("\x00", "")
 
 
+# 업로드 파이프라인 단계 (작업 상태 조회 시 이 순서대로 표시)
+UPLOAD_STAGES = ['extract', 'store_pages', 'summarize', 'index', 'upload_original', 'db_insert', 'translate']
+# 번역 재개 작업 단계
+RESUME_STAGES = ['download', 'translate']
+# 일괄 업로드 한 번에 받을 수 있는 최대 파일 수와 전체 크기
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "50"))
+BATCH_MAX_TOTAL_BYTES = int(os.environ.get("BATCH_MAX_TOTAL_MB", "200")) * 1024 * 1024
+# 일괄 업로드 작업 단계 (원본은 Storage에 올린 뒤 로컬 버퍼를 놓고, 번역할 때 다시 받음)
+BATCH_STAGES = UPLOAD_STAGES[:-1] + ['download', 'translate']
+# 일괄 삭제 한 번에 받을 수 있는 최대 문서 수
+BULK_DELETE_MAX = int(os.environ.get("BULK_DELETE_MAX", "500"))
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_translate():
-    logger.info("========== [프로세스 시작] ==========")
-    
-    # 0. 메모리 정리 (시작 전 청소)
-    gc.collect()
+    logger.info("========== [업로드 요청] ==========")
 
     # 1. 파일 유효성 검사
-    if 'file' not in request.files:
-        return jsonify({"error": "파일이 전송되지 않았습니다."}), 400
+    # 업로드 파일은 파싱되는 동안 SpooledUpload에 바로 기록됨 (해시/크기 검사 포함)
+    save_started = time.perf_counter()
+    try:
+        if 'file' not in request.files:
+            return jsonify({"error": "파일이 전송되지 않았습니다."}), 400
+    except UploadTooLarge as e:
+        metrics.observe_stage('save', FAILED, time.perf_counter() - save_started)
+        return jsonify({"error": str(e)}), 413
+    metrics.observe_stage('save', SUCCESS, time.perf_counter() - save_started)
 
     file = request.files['file']
+    upload = file.stream
     user_id = request.form.get('user_id')
+    # 먼저 번역할 페이지 (예: "1-3,7"), 없으면 앞에서부터
+    priority_pages = request.form.get('priority_pages')
 
     if not user_id or user_id == 'undefined':
+        upload.release()
         return jsonify({"error": "로그인 정보(User ID)가 유실되었습니다."}), 400
+    try:
+        validate_page_ranges(priority_pages)
+    except ValueError:
+        upload.release()
+        return jsonify({"error": "priority_pages 형식이 올바르지 않습니다. (예: 1-3,7)"}), 400
 
-    # 2. 파일명 및 경로 설정
+    # 2. 파일명 설정
     original_title = secure_filename(file.filename)
     unique_id = uuid.uuid4().hex
-    
-    input_filename = f"original_{unique_id}.pdf"
-    final_output_filename = f"translated_{unique_id}.pdf"
-    
-    input_path = os.path.join(TEMP_DIR, input_filename)
-    final_output_path = os.path.join(TEMP_DIR, final_output_filename)
-    prompt_path = os.path.join(TEMP_DIR, f"prompt_{unique_id}.txt")
+    logger.info(f"📂 원본 수신 완료: {upload.size} bytes ({'메모리' if upload.in_memory else '디스크'})")
+
+    # 3. 같은 내용(+번역 언어/프롬프트)을 이미 처리했다면 결과를 재사용
+    file_hash = upload.sha256
+    key = content_key(file_hash, TRANSLATE_LANG_IN, TRANSLATE_LANG_OUT, TRANSLATE_PROMPT)
+    try:
+        existing = find_processed(supabase, key)
+        if existing:
+            new_file_id = clone_record(supabase, existing, user_id, original_title)
+            upload.release()
+            logger.info(f"♻️ 중복 업로드 재사용: {existing['id']} -> {new_file_id}")
+            return jsonify({
+                "message": "처리 완료",
+                "file_id": new_file_id,
+                "translate_status": "success",
+                "deduplicated": True
+            }), 200
+    except Exception as e:
+        # 조회 실패 시에는 평소처럼 새로 처리
+        logger.error(f"⚠️ 중복 조회 실패: {e}")
+
+    job = job_manager.submit(
+        run_upload_pipeline, UPLOAD_STAGES,
+        {'user_id': user_id, 'original_title': original_title, 'content_hash': key},
+        upload=upload.detach(), unique_id=unique_id, original_title=original_title, user_id=user_id,
+        file_hash=file_hash, content_hash=key, priority_pages=priority_pages
+    )
+
+    return jsonify({
+        "message": "처리 대기 중",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }), 202
 
-    # 정리 대상 파일 리스트
-    files_to_clean = [input_path, prompt_path]
+
+def run_upload_pipeline(job, upload, unique_id, original_title, user_id, file_hash, content_hash,
+                        priority_pages=None):
+    logger.info(f"========== [프로세스 시작] {job.id} ==========")
 
     try:
-        # ---------------------------------------------------------
-        # A. 원본 파일 로컬 저장
-        # ---------------------------------------------------------
-        file.save(input_path)
-        logger.info(f"📂 원본 저장 완료: {input_path}")
+        db_data = _prepare_document(job, upload, original_title, user_id, file_hash, content_hash)
 
         # ---------------------------------------------------------
-        # B. [최적화] 텍스트 추출 (원본 파일 사용 & 제한 읽기)
-        # 번역본을 기다리지 않고 원본에서 바로 추출하여 메모리와 시간을 아낍니다.
+        # E. DB 저장 (번역 전에 먼저 저장해서 문서를 바로 볼 수 있게 함)
         # ---------------------------------------------------------
+        with job.stage('db_insert'):
+            with supabase_call('insert'):
+                response = supabase.table('Files').insert(db_data).execute()
+            new_file_id = response.data[0]['id']
+            job.result['file_id'] = new_file_id
+
+        translate_success = _translate_upload(
+            job, upload, unique_id, new_file_id, original_title, content_hash, priority_pages
+        )
+        return {
+            "file_id": new_file_id,
+            "translate_status": "success" if translate_success else "failed"
+        }
+
+    finally:
+        # 업로드 버퍼 해제 (메모리/디스크)
+        upload.release()
+
+
+def _prepare_document(job, upload, original_title, user_id, file_hash, content_hash):
+    # 업로드/일괄 업로드 공통: 텍스트 추출부터 원본 업로드까지 하고 Files에 넣을 행을 반환
+    # Storage 경로는 내용 해시 기반 (같은 내용이면 같은 객체를 공유)
+    original_storage_path = f"originals/{file_hash}.pdf"
+
+    # ---------------------------------------------------------
+    # B. 텍스트 추출 (원본 파일 사용, 전체 페이지)
+    # 번역본을 기다리지 않고 원본에서 바로 추출하여 메모리와 시간을 아낍니다.
+    # ---------------------------------------------------------
+    text_content = ""
+    pages = []
+    job.start_stage('extract')
+    try:
+        # 페이지 단위로 추출 (페이지가 많으면 프로세스 풀에서 병렬 처리)
+        # 메모리 예산을 넘을 것 같으면 다른 작업이 끝날 때까지 대기
+        with admission.admit('extract') as ticket:
+            pages = list(iter_pages(upload.pdf_source(), backend=EXTRACT_BACKEND))
+            text_content = "\n\n".join(pages)
+        job.update_stage('extract', peak_rss_mb=round(ticket.peak_mb, 1))
+
+        logger.info(f"📝 텍스트 추출 완료 ({len(text_content)}자)")
+        job.finish_stage('extract')
+    except MemoryBudgetExceeded as e:
+        # 메모리가 없어 추출을 못 한 것은 빈 문서가 아니므로 작업 전체를 실패 처리 (행도 만들지 않음)
+        logger.error(f"🧠 {e}")
+        job.finish_stage('extract', FAILED, str(e))
+        raise
+    except Exception as e:
+        logger.error(f"⚠️ 텍스트 추출 실패: {e}")
         text_content = ""
-        try:
-            with fitz.open(input_path) as doc:
-                # 최대 5페이지만 읽거나 3000자 넘으면 중단 (메모리 절약)
-                for i, page in enumerate(doc):
-                    if i >= 5: break 
-                    text_content += page.get_text()
-                    if len(text_content) > 4000: break
-            
-            logger.info(f"📝 텍스트 추출 완료 ({len(text_content)}자)")
-        except Exception as e:
-            logger.error(f"⚠️ 텍스트 추출 실패: {e}")
-            text_content = ""
+        job.finish_stage('extract', FAILED, str(e))
 
-        # ---------------------------------------------------------
-        # C. AI 요약 생성 (가벼운 작업 먼저 실행)
-        # ---------------------------------------------------------
+    # ---------------------------------------------------------
+    # B-2. 전체 텍스트를 페이지별로 압축 저장 (Files에는 앞부분만 남김)
+    # ---------------------------------------------------------
+    job.start_stage('store_pages')
+    try:
+        if pages:
+            save_pages(supabase, STORAGE_BUCKET, content_hash, pages)
+            job.finish_stage('store_pages')
+        else:
+            job.finish_stage('store_pages', SKIPPED, "추출된 페이지 없음")
+    except Exception as e:
+        logger.error(f"⚠️ 페이지 텍스트 저장 실패: {e}")
+        job.finish_stage('store_pages', FAILED, str(e))
+
+    # ---------------------------------------------------------
+    # C. AI 요약 생성 (가벼운 작업 먼저 실행)
+    # ---------------------------------------------------------
+    job.start_stage('summarize')
+    try:
+        from summarize import summarize_document
+        # 긴 문서는 청크로 나눠 병렬 요약 후 합침 (토큰 상한은 MAX_SUMMARY_TOKENS)
+        pdf_summary, pdf_understand = summarize_document(text_content, combined=SUMMARY_COMBINED)
+        job.finish_stage('summarize')
+    except Exception as e:
+        logger.error(f"⚠️ 요약 생성 에러: {e}")
+        pdf_summary = "요약 생성 실패"
+        pdf_understand = ["핵심 내용을 추출하지 못했습니다."]
+        job.finish_stage('summarize', FAILED, str(e))
+
+    # ---------------------------------------------------------
+    # C-2. 채팅 검색용 청크 인덱스 생성 (문서당 한 번, 실패해도 계속 진행)
+    # ---------------------------------------------------------
+    job.start_stage('index')
+    try:
+        if text_content.strip():
+            save_index(supabase, STORAGE_BUCKET, content_hash, build_index(text_content))
+            job.finish_stage('index')
+        else:
+            job.finish_stage('index', SKIPPED, "추출된 텍스트 없음")
+    except Exception as e:
+        logger.error(f"⚠️ 인덱스 생성 실패: {e}")
+        job.finish_stage('index', FAILED, str(e))
+
+    # ---------------------------------------------------------
+    # D. Supabase 원본 업로드 (안전하게 먼저 확보)
+    # ---------------------------------------------------------
+    with job.stage('upload_original'):
+        # 받은 버퍼를 그대로 전송 (메모리면 bytes, 디스크로 넘어갔으면 그 파일)
+        with supabase_call('storage_upload'):
+            supabase.storage.from_(STORAGE_BUCKET).upload(
+                original_storage_path, upload.storage_body(),
+                file_options={"content-type": "application/pdf", "upsert": "true"}
+            )
+        original_url = supabase.storage.from_(STORAGE_BUCKET).get_public_url(original_storage_path)
+
+    return {
+        'user_id': user_id,
+        'original_title': original_title,
+        'translated_title': original_title,
+        'original_url': original_url,
+        'translated_url': None, # 번역이 끝나면 채워짐
+        'summarize': pdf_summary,
+        'understand': pdf_understand,
+        'extracted_text': text_content[:5000],
+        'content_hash': content_hash
+    }
+
+
+def _translate_upload(job, upload, unique_id, file_id, original_title, content_hash, priority_pages=None):
+    # ---------------------------------------------------------
+    # F. 번역 실행 (가장 무거운 작업 - 페이지 배치 단위로 진행/저장)
+    # ---------------------------------------------------------
+    # 작업마다 별도 출력 디렉터리 사용 (공유 TEMP_DIR 스캔 제거)
+    output_dir = translation_pool.make_output_dir(TEMP_DIR, unique_id)
+    try:
+        # pdf2zh는 파일 경로가 필요하므로 이때만 디스크에 씀
+        return _run_translation(
+            job, file_id, original_title, content_hash, upload.materialize(output_dir),
+            output_dir, priority_pages
+        )
+    finally:
+        remove_output_dir(output_dir)
+
+
+# 여러 PDF를 한 번에 업로드 (파일 필드 이름: files)
+# 파일마다 작업을 만들어 공용 작업 풀에서 병렬 처리하고, Files 행은 모두 모아서 한 번에 insert
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_batch():
+    logger.info("========== [일괄 업로드 요청] ==========")
+    # 요청 전체 크기는 BATCH_MAX_TOTAL_MB까지 (파일 하나의 제한은 SpooledUpload가 검사)
+    # 파일이 많으면 메모리 버퍼가 쌓여 메모리 예산 밖에서 커지므로 모든 파일을 바로 디스크에 받음
+    request.max_content_length = BATCH_MAX_TOTAL_BYTES + 1024 * 1024
+    request.spool_max_memory = 0
+
+    try:
+        files = request.files.getlist('files')
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    uploads = [f.stream for f in files]
+
+    def release_all():
+        for upload in uploads:
+            upload.release()
+
+    user_id = request.form.get('user_id')
+    if not user_id or user_id == 'undefined':
+        release_all()
+        return jsonify({"error": "로그인 정보(User ID)가 유실되었습니다."}), 400
+    if not files:
+        return jsonify({"error": "파일이 전송되지 않았습니다."}), 400
+    if len(files) > BATCH_MAX_FILES:
+        release_all()
+        return jsonify({"error": f"한 번에 최대 {BATCH_MAX_FILES}개까지 업로드할 수 있습니다."}), 400
+
+    keys = [content_key(f.stream.sha256, TRANSLATE_LANG_IN, TRANSLATE_LANG_OUT, TRANSLATE_PROMPT) for f in files]
+    # 이미 처리된 파일은 한 번의 조회로 찾음
+    processed = {}
+    try:
+        processed = find_processed_many(supabase, set(keys))
+    except Exception as e:
+        logger.error(f"⚠️ 중복 조회 실패: {e}")
+
+    results = []
+    clones = []      # (결과 위치, 복제할 행) - 이미 처리된 파일
+    to_process = []  # (결과 위치, 파일 정보) - 새로 처리할 파일
+    seen = {}
+    for file, key in zip(files, keys):
+        upload = file.stream
+        original_title = secure_filename(file.filename)
+        result = {"filename": original_title}
+        results.append(result)
+
+        # 같은 요청 안에 같은 파일이 여러 번 있으면 한 번만 처리
+        if key in seen:
+            result.update({"status": "duplicate", "duplicate_of": seen[key]})
+            upload.release()
+            continue
+        seen[key] = original_title
+
+        existing = processed.get(key)
+        if existing:
+            clones.append((result, clone_row(existing, user_id, original_title)))
+            upload.release()
+        else:
+            to_process.append((result, upload, original_title, key))
+
+    # 이미 처리된 파일들은 행 복제만 한 번에
+    if clones:
         try:
-            # 요약용 텍스트는 3000자로 자름
-            summary_input = text_content[:3000] if text_content else "내용 없음"
-            pdf_summary = summarization(summary_input)
-            pdf_understand = understand(summary_input)
+            with supabase_call('insert'):
+                response = supabase.table('Files').insert([row for _, row in clones]).execute()
+            for (result, _), row in zip(clones, response.data):
+                result.update({"status": "success", "file_id": row['id'], "deduplicated": True})
         except Exception as e:
-            logger.error(f"⚠️ 요약 생성 에러: {e}")
-            pdf_summary = "요약 생성 실패"
-            pdf_understand = ["핵심 내용을 추출하지 못했습니다."]
+            logger.error(f"⚠️ 중복 파일 행 복제 실패: {e}")
+            for result, _ in clones:
+                result.update({"status": "failed", "error": str(e)})
+
+    if to_process:
+        batch = BatchCollector(len(to_process), _insert_batch_rows)
+        for result, upload, original_title, key in to_process:
+            job = job_manager.submit(
+                run_batch_item, BATCH_STAGES,
+                {'user_id': user_id, 'original_title': original_title, 'content_hash': key},
+                batch=batch, upload=upload.detach(), unique_id=uuid.uuid4().hex, original_title=original_title,
+                user_id=user_id, file_hash=upload.sha256, content_hash=key
+            )
+            result.update({"status": "pending", "job_id": job.id, "status_url": f"/api/jobs/{job.id}"})
+
+    logger.info(f"📦 일괄 업로드 접수: {len(files)}개 (새로 처리 {len(to_process)}개, 재사용 {len(clones)}개)")
+    return jsonify({"message": "처리 대기 중", "files": results}), 202
+
+
+def _insert_batch_rows(rows):
+    # 일괄 업로드된 파일들의 Files 행을 한 번의 insert로 저장하고 id 목록 반환 (요청 순서 유지)
+    with supabase_call('insert'):
+        response = supabase.table('Files').insert(rows).execute()
+    if len(response.data) != len(rows):
+        raise Exception(f"일괄 insert 결과 개수 불일치 ({len(response.data)}/{len(rows)})")
+    return [row['id'] for row in response.data]
+
+
+def run_batch_item(job, batch, upload, unique_id, original_title, user_id, file_hash, content_hash):
+    # 일괄 업로드의 파일 하나: 원본 업로드까지 처리하고 행은 batch에 넘김
+    # 마지막 파일이 도착하면 한 번에 insert 한 뒤 각 작업이 번역 단계부터 이어서 실행됨
+    logger.info(f"========== [일괄 처리 시작] {job.id} ({original_title}) ==========")
+    try:
+        db_data = _prepare_document(job, upload, original_title, user_id, file_hash, content_hash)
+    except Exception:
+        batch.discard()
+        raise
+    finally:
+        # 원본은 Storage에 올라갔으므로 로컬 임시 파일은 바로 정리
+        # (번역 차례를 기다리는 파일들이 디스크를 계속 잡고 있지 않도록 번역할 때 다시 받음)
+        upload.release()
 
-        # ---------------------------------------------------------
-        # D. Supabase 원본 업로드 (안전하게 먼저 확보)
-        # ---------------------------------------------------------
-        with open(input_path, "rb") as f:
-            path = f"originals/{input_filename}"
-            supabase.storage.from_(STORAGE_BUCKET).upload(path, f, file_options={"content-type": "application/pdf"})
-            original_url = supabase.storage.from_(STORAGE_BUCKET).get_public_url(path)
+    original_path = _storage_path_from_url(db_data['original_url'])
+    job.start_stage('db_insert')
 
-        # ---------------------------------------------------------
-        # E. 번역 실행 (가장 무거운 작업 - 실패 가능성 있음)
-        # ---------------------------------------------------------
-        translate_success = False
-        translated_url = None
-        
-        # 메모리 확보를 위해 강제 GC 실행
-        gc.collect() 
-
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if api_key:
-            try:
-                # 프롬프트 파일 생성
-                with open(prompt_path, "w", encoding="utf-8") as f:
-                    f.write("전문 용어 제외하고 한국어로 번역. 코드나 논문 제목은 원문 유지.")
-
-                env = os.environ.copy()
-                env['GEMINI_API_KEY'] = api_key
-                
-                # 타임아웃 120초로 증가 (무료 플랜 성능 고려)
-                # 주의: Render 무료 플랜은 subprocess 실행 시 메모리가 튀면 바로 Kill 당함
-                command = [
-                    "pdf2zh", input_path,
-                    "-li", "en", "-lo", "ko",
-                    "-s", "google:gemini",
-                    "-o", TEMP_DIR,
-                    "--prompt", prompt_path,
-                    "-t", "1" # 스레드 1개로 제한 (중요!)
-                ]
-                
-                logger.info("🤖 번역 프로세스 시작...")
-                subprocess.run(command, check=True, env=env, capture_output=True, timeout=120)
-
-                # 번역 결과물 찾기 로직
-                files_in_dir = os.listdir(TEMP_DIR)
-                target_prefix = input_filename.replace('.pdf', '')
-                
-                for fname in files_in_dir:
-                    if fname.endswith("-mono.pdf") and (target_prefix in fname):
-                        os.rename(os.path.join(TEMP_DIR, fname), final_output_path)
-                        files_to_clean.append(final_output_path)
-                        
-                        # 번역본 업로드
-                        with open(final_output_path, "rb") as f_trans:
-                            path_trans = f"translated/{final_output_filename}"
-                            supabase.storage.from_(STORAGE_BUCKET).upload(path_trans, f_trans, file_options={"content-type": "application/pdf"})
-                            translated_url = supabase.storage.from_(STORAGE_BUCKET).get_public_url(path_trans)
-                        
-                        translate_success = True
-                        logger.info("✅ 번역 및 업로드 성공")
-                        break
-                        
-            except subprocess.TimeoutExpired:
-                logger.error("⏰ 번역 시간 초과 (Timeout)")
-            except Exception as e:
-                logger.error(f"⚠️ 번역 프로세스 실패 (메모리 부족 등): {e}")
-        
-        # ---------------------------------------------------------
-        # F. DB 저장 (번역 실패했어도 원본 데이터는 저장)
-        # ---------------------------------------------------------
-        db_data = {
-            'user_id': user_id,
-            'original_title': original_title,
-            'translated_title': f"{original_title} (번역본)" if translate_success else original_title,
-            'original_url': original_url,
-            'translated_url': translated_url, # None이면 DB에 null로 들어감
-            'summarize': pdf_summary,
-            'understand': pdf_understand,
-            'extracted_text': text_content[:5000]
+    def on_inserted(file_id, error):
+        job_manager.resume(job, _finish_batch_item, original_path, unique_id, original_title, content_hash,
+                           file_id, error)
+
+    batch.add(db_data, on_inserted)
+    return DEFERRED
+
+
+def _finish_batch_item(job, original_path, unique_id, original_title, content_hash, file_id, error):
+    if error is not None:
+        job.finish_stage('db_insert', FAILED, str(error))
+        raise error
+    job.finish_stage('db_insert')
+    job.result['file_id'] = file_id
+
+    work_dir = translation_pool.make_output_dir(TEMP_DIR, unique_id)
+    try:
+        source_path = _download_original(job, original_path, work_dir)
+        translate_success = _run_translation(job, file_id, original_title, content_hash, source_path, work_dir)
+        return {
+            "file_id": file_id,
+            "translate_status": "success" if translate_success else "failed"
         }
+    finally:
+        remove_output_dir(work_dir)
 
-        response = supabase.table('Files').insert(db_data).execute()
-        new_file_id = response.data[0]['id']
 
-        # 성공 응답 반환
+def _run_translation(job, file_id, original_title, content_hash, source_path, work_dir, priority_pages=None):
+    # 배치 단위 번역 실행 후 모두 끝나면 Files 행의 번역본 URL을 채움
+    # 일부 배치가 실패해도 끝난 배치는 저장되어 있어서 재개 시 이어서 진행됨
+    job.start_stage('translate')
+    if not os.environ.get("GEMINI_API_KEY"):
+        job.finish_stage('translate', SKIPPED, "GEMINI_API_KEY 없음")
+        return False
+
+    def on_batch(done_pages, total_pages):
+        job.result['translated_pages'] = done_pages
+        job.result['total_pages'] = total_pages
+
+    try:
+        logger.info("🤖 번역 작업 시작...")
+        priority = parse_page_ranges(priority_pages, page_count(source_path)) if priority_pages else None
+        translated_url, ticket = _translate_shared(content_hash, source_path, work_dir, priority, on_batch)
+        job.update_stage('translate', peak_rss_mb=round(ticket.peak_mb, 1))
+    except MemoryBudgetExceeded as e:
+        logger.error(f"🧠 {e}")
+        job.finish_stage('translate', FAILED, str(e))
+        return False
+    except TranslationInProgress as e:
+        job.finish_stage('translate', FAILED, str(e))
+        return False
+    except Exception as e:
+        logger.error(f"⚠️ 번역 프로세스 실패 (메모리 부족 등): {e}")
+        job.finish_stage('translate', FAILED, str(e))
+        return False
+
+    if not translated_url:
+        job.finish_stage('translate', FAILED, "일부 페이지 번역 실패 (다시 요청하면 남은 페이지부터 이어서 번역)")
+        return False
+
+    with supabase_call('update'):
+        supabase.table('Files').update({
+            'translated_url': translated_url,
+            'translated_title': f"{original_title} (번역본)"
+        }).eq('id', file_id).execute()
+    invalidate_document(file_id)
+    logger.info("✅ 번역 및 업로드 성공")
+    job.finish_stage('translate')
+    return True
+
+
+def _translate_shared(content_hash, source_path, work_dir, priority, on_batch):
+    # 같은 문서를 다른 작업이 번역 중이면 끝날 때까지 기다렸다가 이어서 실행
+    # (끝난 배치와 완료 여부는 manifest에 있으므로 보통은 바로 최종 URL을 돌려받아 이 행에도 기록)
+    # 기다리는 동안에는 번역 메모리 예산을 잡지 않음
+    deadline = time.monotonic() + TRANSLATE_WAIT_TIMEOUT
+    while True:
+        if not wait_for_translation(content_hash, max(0.0, deadline - time.monotonic())):
+            raise TranslationInProgress("같은 문서의 번역이 아직 끝나지 않았습니다. 나중에 다시 요청해 주세요.")
+        try:
+            # 번역 워커 메모리까지 포함해 예산 안에서만 실행 (gc.collect 대신 입장 제어)
+            with admission.admit('translate', warm=translation_pool.is_warm()) as ticket:
+                translated_url = translate_progressively(
+                    supabase, STORAGE_BUCKET, content_hash, source_path, work_dir,
+                    TRANSLATE_LANG_IN, TRANSLATE_LANG_OUT, TRANSLATE_PROMPT,
+                    priority_pages=priority, on_batch=on_batch
+                )
+            return translated_url, ticket
+        except TranslationInProgress:
+            # 기다리는 사이 다른 작업이 먼저 시작함
+            continue
+
+
+def run_resume_translation(job, file_id, original_title, content_hash, original_path, priority_pages=None):
+    # 시간 초과/중단된 번역을 마지막으로 끝난 배치 다음부터 이어서 진행
+    work_dir = translation_pool.make_output_dir(TEMP_DIR, uuid.uuid4().hex)
+    try:
+        source_path = _download_original(job, original_path, work_dir)
+        job.result['file_id'] = file_id
+        success = _run_translation(job, file_id, original_title, content_hash, source_path, work_dir, priority_pages)
+        return {"file_id": file_id, "translate_status": "success" if success else "failed"}
+    finally:
+        remove_output_dir(work_dir)
+
+
+def _download_original(job, original_path, work_dir):
+    # Storage에 올려 둔 원본을 작업 디렉터리로 받음 (번역 재개, 일괄 업로드 번역)
+    with job.stage('download'):
+        source_path = os.path.join(work_dir, "original.pdf")
+        with open(source_path, "wb") as f, supabase_call('storage_download'):
+            f.write(supabase.storage.from_(STORAGE_BUCKET).download(original_path))
+    return source_path
+
+
+def _storage_path_from_url(public_url):
+    # .../public/<bucket>/originals/abc.pdf -> originals/abc.pdf
+    return public_url.split(f"/public/{STORAGE_BUCKET}/")[-1].split('?')[0]
+
+
+# 번역 진행 상황 (끝난 페이지 배치별 URL 포함)
+@app.route('/api/documents/<file_id>/translation', methods=['GET'])
+def translation_status(file_id):
+    user_id = request.args.get('user_id')
+    try:
+        with supabase_call('select'):
+            response = supabase.table('Files').select('content_hash, translated_url') \
+                .eq('id', file_id).eq('user_id', user_id).single().execute()
+        row = response.data
+        if not row or not row.get('content_hash'):
+            return jsonify({'error': '문서를 찾을 수 없습니다.'}), 404
+        manifest, batches = batch_urls(supabase, STORAGE_BUCKET, row['content_hash'])
         return jsonify({
-            "message": "처리 완료",
-            "file_id": new_file_id,
-            "translate_status": "success" if translate_success else "failed"
-        })
+            'file_id': file_id,
+            'completed': bool(row.get('translated_url')),
+            'translated_url': row.get('translated_url'),
+            'total_pages': manifest.data['pages'],
+            'translated_pages': manifest.translated_pages(),
+            'batches': batches
+        }), 200
+    except Exception as e:
+        print(f'조회 오류: {e}')
+        return jsonify({'error': '문서를 찾거나 조회할 수 없습니다.'}), 400
+
+
+# 번역 재개 / 특정 페이지 먼저 번역 요청 (body: user_id, pages="1-3,7")
+@app.route('/api/documents/<file_id>/translation', methods=['POST'])
+def resume_translation(file_id):
+    data = request.json or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': '유저 ID가 필요합니다.'}), 400
+    try:
+        validate_page_ranges(data.get('pages'))
+    except ValueError:
+        return jsonify({'error': 'pages 형식이 올바르지 않습니다. (예: 1-3,7)'}), 400
+    try:
+        with supabase_call('select'):
+            response = supabase.table('Files').select('original_title, original_url, translated_url, content_hash') \
+                .eq('id', file_id).eq('user_id', user_id).single().execute()
+        row = response.data
+    except Exception as e:
+        print(f'조회 오류: {e}')
+        return jsonify({'error': '문서를 찾거나 조회할 수 없습니다.'}), 400
+    if not row or not row.get('content_hash'):
+        return jsonify({'error': '문서를 찾을 수 없습니다.'}), 404
+    if row.get('translated_url'):
+        return jsonify({'message': '이미 번역이 완료된 문서입니다.', 'translated_url': row['translated_url']}), 200
+
+    job = job_manager.submit(
+        run_resume_translation, RESUME_STAGES,
+        {'user_id': user_id, 'file_id': file_id, 'content_hash': row['content_hash']},
+        file_id=file_id, original_title=row['original_title'], content_hash=row['content_hash'],
+        original_path=_storage_path_from_url(row['original_url']), priority_pages=data.get('pages')
+    )
+    return jsonify({
+        "message": "번역 재개 대기 중",
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}"
+    }), 202
+
+
+# Prometheus 수집용 지표 (단계별 시간, Gemini/Supabase 지연, 토큰, 오류, 메모리)
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(admission.report(), cache_stats()), mimetype='text/plain; version=0.0.4')
+
+
+# 시작 시간과 모듈별 import 비용 (IMPORT_PROFILE=1일 때 상세)
+@app.route('/api/startup', methods=['GET'])
+def startup_report():
+    return jsonify(import_profile.startup_report()), 200
+
 
+# 문서/채팅 캐시 적중률
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_statistics():
+    return jsonify(cache_stats()), 200
+
+
+# 메모리 사용량과 단계별 최대치
+@app.route('/api/memory', methods=['GET'])
+def memory_report():
+    return jsonify(admission.report()), 200
+
+
+# 번역 메모리 적중률 등 통계 (번역 워커들과 같은 DB 파일을 읽음)
+@app.route('/api/translation-memory/stats', methods=['GET'])
+def translation_memory_stats():
+    try:
+        return jsonify(translation_memory.stats()), 200
     except Exception as e:
-        logger.error(f"❌ [치명적 서버 에러]: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        return jsonify({'error': str(e)}), 500
 
-    finally:
-        # 파일 정리 및 메모리 해제
-        for f in files_to_clean:
-            if os.path.exists(f):
-                try:
-                    os.remove(f)
-                except:
-                    pass
-        gc.collect() # 마지막으로 메모리 비우기
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
+# 업로드 작업 상태 조회
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# 단계별 진행 상황 조회
+@app.route('/api/jobs/<job_id>/stages', methods=['GET'])
+def job_stages(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    data = job.to_dict()
+    return jsonify({
+        'job_id': data['job_id'],
+        'status': data['status'],
+        'progress': data['progress'],
+        'stages': data['stages']
+    }), 200
+
+
+def _prepare_chat():
+    # chat / chat_stream 공통: 요청 검증 + 문서 조회 + 프롬프트 생성
+    # 반환: (에러 응답 또는 None, 모델 이름, 프롬프트)
     # 1. 데이터 가져오기
     try:
         data = request.json
         user_input = data.get('message')
         file_id = data.get('file_id')
     except:
-        return jsonify({'response': '잘못된 요청 형식입니다.'}), 400
+        return (jsonify({'response': '잘못된 요청 형식입니다.'}), 400), None, None
 
-    if not user_input: return jsonify({'response': '메시지가 없습니다.'}), 400
-    if not file_id: return jsonify({'response': '파일 ID가 없습니다.'}), 400
+    if not user_input: return (jsonify({'response': '메시지가 없습니다.'}), 400), None, None
+    if not file_id: return (jsonify({'response': '파일 ID가 없습니다.'}), 400), None, None
 
-    # 2. API 키 설정
+    # 2. API 키 확인 (클라이언트 설정은 gemini_client에서 한 번만)
     api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
-    if not api_key: return jsonify({"error": "API Key 없음"}), 500
+    if not api_key: return (jsonify({"error": "API Key 없음"}), 500), None, None
 
-    genai.configure(api_key=api_key)
+    # 3. DB 조회 (같은 문서로 이어지는 채팅은 캐시에서)
+    record = get_document(file_id)
+    if not record: return (jsonify({'response': '파일 없음'}), 404), None, None
 
-    # 3. DB 조회
-    try:
-        record = supabase.table('Files').select('extracted_text').eq('id', file_id).execute()
-        if not record.data: return jsonify({'response': '파일 없음'}), 404
+    final_prompt = build_chat_prompt(record, user_input)
+
+    # 모델 이름은 프로세스 단위로 캐시 (TTL 지나면 백그라운드 갱신), 모델 객체도 재사용
+    return None, resolve_chat_model_name(), final_prompt
 
-        file_text = record.data[0]['extracted_text'] or "내용 없음"
+
+def get_document(file_id):
+    # Files 행 전체 (캐시에 있으면 DB 조회 생략, 번역 완료/삭제 시 무효화됨)
+    def load():
+        with supabase_call('select'):
+            response = supabase.table('Files').select('*').eq('id', file_id).execute()
+        return response.data[0] if response.data else None
+
+    return record_cache.get_or_load(str(file_id), load)
+
+
+def build_chat_prompt(record, user_input):
+    # Files 행(extracted_text, content_hash)과 질문으로 채팅 프롬프트 생성
+    # 업로드 때 만든 인덱스에서 질문과 관련된 청크만 가져옴
+    # (비동기 라우트는 async_app에서 인덱스 로드/검색만 비동기로 하고 chat_prompt를 같이 씀)
+    index = load_index(supabase, STORAGE_BUCKET, record.get('content_hash'))
+    chunks = index.search(user_input) if index else None
+    return chat_prompt(record, chunks, user_input)
+
+
+def chat_prompt(record, chunks, user_input):
+    if chunks:
+        truncated_text = "\n\n...\n\n".join(chunks)
+    else:
+        # 인덱스가 없는 예전 문서
+        file_text = record['extracted_text'] or "내용 없음"
         truncated_text = file_text[:30000]  # 길이 제한
 
-        # 4. [핵심] 사용 가능한 모델 자동 검색 (에러 방지용)
-        valid_model_name = 'gemini-pro'  # 기본값
-        try:
-            print("--- 모델 찾는 중 ---")
-            for m in genai.list_models():
-                if 'generateContent' in m.supported_generation_methods:
-                    # 'gemini'가 들어가는 모델 찾기
-                    if 'gemini' in m.name:
-                        valid_model_name = m.name
-                        print(f"사용할 모델 발견: {valid_model_name}")
-                        break
-        except Exception as e:
-            print(f"모델 목록 조회 실패 (기본값 사용): {e}")
+    # 4. 프롬프트 합치기 (구버전 호환성 100%)
+    # system_instruction 파라미터를 안 쓰고 직접 합칩니다.
+    return f"""
+    [문서 내용]
+    {truncated_text}
 
-        # 5. 프롬프트 합치기 (구버전 호환성 100%)
-        # system_instruction 파라미터를 안 쓰고 직접 합칩니다.
-        final_prompt = f"""
-        [문서 내용]
-        {truncated_text}
+    [지시]
+    위 내용을 바탕으로 아래 질문에 한국어로 답해줘.
 
-        [지시]
-        위 내용을 바탕으로 아래 질문에 한국어로 답해줘.
+    [질문]
+    {user_input}
+    """
 
-        [질문]
-        {user_input}
-        """
 
-        # 검색된 모델 이름으로 생성
-        model = genai.GenerativeModel(valid_model_name)
+@app.route('/api/chat', methods=['POST'])
+def chat():
+    try:
+        error, model_name, final_prompt = _prepare_chat()
+        if error: return error
 
-        response = model.generate_content(final_prompt)
+        # 공용 Gemini 클라이언트 (속도 제한/재시도/동시성 제한)
+        response = generate(final_prompt, model_name)
         return jsonify({'response': response.text})
 
     except Exception as e:
@@ -395,33 +883,200 @@ def chat():
         return jsonify({'response': f'오류 발생: {str(e)}'}), 500
 
 
+def _sse(data, event=None):
+    # Server-Sent Events 한 건 포맷
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# 채팅 스트리밍 (토큰이 생성되는 대로 SSE로 전달)
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    try:
+        error, model_name, final_prompt = _prepare_chat()
+        if error: return error
+    except Exception as e:
+        print(f"Error Log: {e}")
+        return jsonify({'response': f'오류 발생: {str(e)}'}), 500
+
+    def generate():
+        response = None
+        try:
+            response = generate_stream(final_prompt, model_name)
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    yield _sse({'text': text})
+            yield _sse({'done': True}, event='done')
+        except GeneratorExit:
+            # 클라이언트 연결 끊김: Gemini 스트림도 중단해서 토큰 낭비를 막음
+            print("클라이언트 연결 종료, 스트림 중단")
+            if response is not None:
+                response.close()
+            raise
+        except Exception as e:
+            print(f"Error Log: {e}")
+            yield _sse({'response': f'오류 발생: {str(e)}'}, event='error')
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # 프록시(nginx 등) 버퍼링 방지
+    })
+
+
+# 목록 화면에 필요한 메타데이터 컬럼만 (본문/요약 등 큰 필드는 viewMyDocument에서)
+LIST_COLUMNS = 'id, user_id, original_title, translated_title, original_url, translated_url, created_at'
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 100
+
+
+def _encode_cursor(row):
+    raw = json.dumps({'c': row['created_at'], 'i': row['id']}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return data['c'], data['i']
+
+
+# 목록 조회는 동기 라우트와 async_app이 같이 씀 (클라이언트만 다르고 쿼리 빌더는 같음)
+def parse_list_limit(value):
+    # 숫자가 아니면 ValueError
+    return min(max(int(value if value is not None else LIST_DEFAULT_LIMIT), 1), LIST_MAX_LIMIT)
+
+
+def list_documents_query(client, user_id, cursor, limit):
+    # (created_at, id) 기준 커서 페이지네이션, 커서가 잘못되면 ValueError
+    query = client.table('Files').select(LIST_COLUMNS).eq('user_id', user_id)
+    if cursor:
+        try:
+            created_at, last_id = _decode_cursor(cursor)
+        except Exception:
+            raise ValueError('잘못된 커서입니다.')
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})'
+        )
+    # 다음 페이지 존재 여부 확인을 위해 하나 더 가져옴
+    return query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1)
+
+
+def list_page(rows, limit):
+    # 한 페이지 분량과 응답 헤더 (다음 페이지 커서는 X-Next-Cursor)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers['X-Next-Cursor'] = _encode_cursor(rows[-1])
+    return rows, headers
+
+
 @app.route('/api/viewDocument', methods=['GET'])
 def views():
+    # (created_at, id) 기준 커서 페이지네이션
+    # 응답 본문은 기존처럼 문서 배열이고, 다음 페이지 커서는 X-Next-Cursor 헤더로 전달
     user_id = request.args.get('user_id')
     try:
-        response = supabase.table('Files').select('*')\
-            .eq('user_id', user_id).order('created_at', desc=True).execute()
-        return jsonify(response.data), 200
+        limit = parse_list_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({'error': 'limit은 숫자여야 합니다.'}), 400
+
+    try:
+        try:
+            query = list_documents_query(supabase, user_id, request.args.get('cursor'), limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        with supabase_call('select'):
+            response = query.execute()
+
+        rows, headers = list_page(response.data, limit)
+        return jsonify(rows), 200, headers
     except Exception as e:
         print(f'조회 오류: {e}')
         return jsonify({'error': '문서를 찾거나 조회할 수 없습니다.'}),400
 
 
+# 전체 텍스트를 페이지 구간 단위로 조회 (start, end는 1부터 시작, end 포함)
+@app.route('/api/documents/<file_id>/pages', methods=['GET'])
+def document_pages(file_id):
+    user_id = request.args.get('user_id')
+    try:
+        start = int(request.args.get('start', 1))
+        end = int(request.args.get('end', start))
+    except ValueError:
+        return jsonify({'error': 'start, end는 숫자여야 합니다.'}), 400
+    if start < 1 or end < start:
+        return jsonify({'error': '페이지 범위가 올바르지 않습니다.'}), 400
+    end = min(end, start + MAX_PAGES_PER_REQUEST - 1)
+
+    try:
+        with supabase_call('select'):
+            response = supabase.table('Files').select('content_hash') \
+                .eq('id', file_id).eq('user_id', user_id).single().execute()
+        content_hash = response.data.get('content_hash') if response.data else None
+        if not content_hash:
+            return jsonify({'error': '페이지 텍스트가 없는 문서입니다.'}), 404
+
+        total = page_reader.get_index(content_hash)['pages']
+        texts = page_reader.read_pages(content_hash, start - 1, end)
+        return jsonify({
+            'file_id': file_id,
+            'total_pages': total,
+            'pages': [{'page': start + i, 'text': t} for i, t in enumerate(texts)]
+        }), 200
+    except Exception as e:
+        print(f'조회 오류: {e}')
+        return jsonify({'error': '문서를 찾거나 조회할 수 없습니다.'}), 400
+
+
 @app.route('/api/viewMyDocument', methods=['GET'])
 def view():
     id = request.args.get('id')
     user_id = request.args.get('user_id')
 
     try:
-        response = supabase.table('Files').select('*') \
-            .eq('id', id).eq('user_id', user_id).single().execute()
-        return jsonify(response.data), 200
+        record = get_document(id)
+        if not record or str(record.get('user_id')) != str(user_id):
+            raise Exception(f"문서 없음 또는 소유자 불일치 ({id})")
+        return jsonify(record), 200
     except Exception as e:
         print(f'조회 오류: {e}')
         return jsonify({'error': '문서를 찾거나 조회할 수 없습니다.'}), 400
 
 
-# app.py
+def document_storage_paths(file_data):
+    # 삭제용: (버킷 이름, 원본/번역본 Storage 경로 목록) (동기/비동기 라우트 공통)
+    # 업로드와 같은 버킷(STORAGE_BUCKET)의 공개 URL에서 내부 경로만 추출
+    # URL 예시: .../public/files/originals/file.pdf -> originals/file.pdf
+    paths_to_remove = [
+        _storage_path_from_url(file_data[column])
+        for column in ('original_url', 'translated_url') if file_data.get(column)
+    ]
+    return STORAGE_BUCKET, paths_to_remove
+
+
+def derived_storage_paths(content_hash):
+    # 내용 해시로 저장된 부가 데이터 경로 (페이지 텍스트, 검색 인덱스, 번역 배치)
+    return storage_paths(content_hash) + [index_path(content_hash)] \
+        + translation_storage_paths(supabase, STORAGE_BUCKET, content_hash)
+
+
+def content_in_use(content_hash):
+    # 이 해시를 처리 중인 업로드/번역 작업이 있는지 (Files 행이 생기기 전에도 Storage에 쓰고 있음)
+    return content_hash in job_manager.active_meta('content_hash') or is_translating(content_hash)
+
+
+# 삭제된 문서의 Storage 객체는 백그라운드에서 모아서 지움 (실패 시 재시도)
+storage_reaper = StorageReaper(STORAGE_BUCKET, derived_storage_paths, content_in_use)
+
+
+def reap_deleted(rows):
+    # Files 행을 지운 뒤 호출: 캐시를 비우고 Storage 정리를 예약
+    # 같은 content_hash를 쓰는 행이 남아 있으면 reaper가 파일을 남겨 둠
+    for row in rows:
+        invalidate_document(row['id'])
+        _, paths = document_storage_paths(row)
+        storage_reaper.enqueue(paths, row.get('content_hash'))
+
 
 @app.route('/api/delete/<file_id>', methods=['DELETE'])
 def delete_document(file_id):
@@ -433,7 +1088,8 @@ def delete_document(file_id):
 
     try:
         # 2. 삭제할 파일 정보 조회 (파일 경로를 알기 위해)
-        response = supabase.table('Files').select('*').eq('id', file_id).single().execute()
+        with supabase_call('select'):
+            response = supabase.table('Files').select('*').eq('id', file_id).single().execute()
         file_data = response.data
 
         # 파일이 없거나, 소유자가 다르면 거부
@@ -443,33 +1099,12 @@ def delete_document(file_id):
         if file_data['user_id'] != user_id:
             return jsonify({'error': '삭제 권한이 없습니다.'}), 403
 
-        # 3. Supabase Storage에서 실제 파일 삭제 (용량 확보)
-        # URL에서 스토리지 내부 경로(path)만 추출하는 로직
-        # URL 예시: .../public/documents/originals/file.pdf -> originals/file.pdf 추출
-        paths_to_remove = []
-        bucket_name = 'documents'  # 사용 중인 버킷 이름 (STORAGE_BUCKET 변수 사용 권장)
-
-        if file_data.get('original_url'):
-            try:
-                # URL에서 버킷 이름 뒷부분의 경로만 잘라냄
-                path = file_data['original_url'].split(f"/public/{bucket_name}/")[-1]
-                paths_to_remove.append(path)
-            except:
-                pass
-
-        if file_data.get('translated_url'):
-            try:
-                path = file_data['translated_url'].split(f"/public/{bucket_name}/")[-1]
-                paths_to_remove.append(path)
-            except:
-                pass
-
-        if paths_to_remove:
-            print(f"🗑️ 스토리지 파일 삭제 시도: {paths_to_remove}")
-            supabase.storage.from_(bucket_name).remove(paths_to_remove)
-
-        # 4. DB 테이블에서 데이터 삭제
-        supabase.table('Files').delete().eq('id', file_id).execute()
+        # 3. DB 테이블에서 데이터 삭제
+        with supabase_call('delete'):
+            supabase.table('Files').delete().eq('id', file_id).execute()
+
+        # 4. Storage 파일은 백그라운드에서 삭제
+        reap_deleted([file_data])
 
         return jsonify({'message': '삭제 성공', 'id': file_id}), 200
 
@@ -478,5 +1113,45 @@ def delete_document(file_id):
         return jsonify({'error': str(e)}), 500
 
 
+# 여러 문서를 한 번에 삭제 (body: user_id, ids=[...])
+# Files 행은 delete 한 번으로 지우고 바로 응답, Storage 정리는 백그라운드에서
+@app.route('/api/delete', methods=['POST'])
+def delete_documents():
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('user_id')
+    ids = data.get('ids')
+
+    if not user_id:
+        return jsonify({'error': '유저 ID가 필요합니다.'}), 400
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': '삭제할 문서 ID 목록(ids)이 필요합니다.'}), 400
+    if len(ids) > BULK_DELETE_MAX:
+        return jsonify({'error': f"한 번에 최대 {BULK_DELETE_MAX}개까지 삭제할 수 있습니다."}), 400
+
+    ids = list(dict.fromkeys(str(i) for i in ids))
+    try:
+        # 본인 문서만 지워지도록 user_id 조건을 함께 걸고, 지워진 행을 돌려받아 Storage 경로를 구함
+        with supabase_call('delete'):
+            response = supabase.table('Files').delete() \
+                .in_('id', ids).eq('user_id', user_id).execute()
+        deleted = response.data or []
+        reap_deleted(deleted)
+
+        deleted_ids = {str(row['id']) for row in deleted}
+        print(f"🗑️ 일괄 삭제: {len(deleted_ids)}/{len(ids)}개")
+        return jsonify({
+            'message': '삭제 성공',
+            'deleted': [i for i in ids if i in deleted_ids],
+            # 없거나 다른 사용자의 문서
+            'not_found': [i for i in ids if i not in deleted_ids],
+            'storage_pending': storage_reaper.pending(),
+        }), 200
+    except Exception as e:
+        print(f"❌ 일괄 삭제 중 오류: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+import_profile.finish()
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,182 @@
+import os
+import logging
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import app as sync_app
+from cache import record_cache
+from clients import get_async_supabase
+from gemini_client import agenerate, resolve_chat_model_name
+from metrics import supabase_call
+from retrieval import aload_index
+
+# 비동기 서버 모드
+#   uvicorn async_app:app --host 0.0.0.0 --port 8000 --workers 2
+# Supabase/Gemini 응답을 기다리는 동안 워커를 붙잡지 않도록 I/O 위주 라우트만 비동기로 처리하고
+# 나머지 라우트(업로드, 작업 상태, 스트리밍 채팅 등)는 기존 Flask 앱으로 넘김
+# 동기 모드가 필요하면 지금처럼 gunicorn app:app 으로 실행
+
+logger = logging.getLogger(__name__)
+
+
+async def _get_document(supabase, file_id):
+    # 동기 라우트의 get_document와 같은 캐시 사용
+    async def load():
+        with supabase_call('select'):
+            response = await supabase.table('Files').select('*').eq('id', file_id).execute()
+        return response.data[0] if response.data else None
+
+    return await record_cache.aget_or_load(str(file_id), load)
+
+
+async def _json(request):
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+async def login(request):
+    data = await _json(request) or {}
+    email = data.get('email')
+    password = data.get('password')
+
+    try:
+        supabase = await get_async_supabase()
+        auth_res = await supabase.auth.sign_in_with_password({'email': email, 'password': password})
+        if not auth_res.user:
+            return JSONResponse({'error': '로그인 실패'}, status_code=401)
+
+        client_name = None
+        if auth_res.user.user_metadata:
+            client_name = auth_res.user.user_metadata.get('client_name')
+        return JSONResponse({
+            "message": "로그인 성공",
+            "token": auth_res.session.access_token,
+            "user": {
+                "id": auth_res.user.id,
+                "email": email,
+                'client_name': client_name
+            }
+        })
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def chat(request):
+    data = await _json(request)
+    if data is None:
+        return JSONResponse({'response': '잘못된 요청 형식입니다.'}, status_code=400)
+    user_input = data.get('message')
+    file_id = data.get('file_id')
+    if not user_input:
+        return JSONResponse({'response': '메시지가 없습니다.'}, status_code=400)
+    if not file_id:
+        return JSONResponse({'response': '파일 ID가 없습니다.'}, status_code=400)
+    if not (os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")):
+        return JSONResponse({"error": "API Key 없음"}, status_code=500)
+
+    try:
+        supabase = await get_async_supabase()
+        record = await _get_document(supabase, file_id)
+        if not record:
+            return JSONResponse({'response': '파일 없음'}, status_code=404)
+
+        # 인덱스 다운로드와 질문 임베딩은 이벤트 루프에서 기다리고, 점수 계산만 스레드에서 실행
+        index = await aload_index(supabase, sync_app.STORAGE_BUCKET, record.get('content_hash'))
+        chunks = await index.asearch(user_input) if index else None
+        final_prompt = sync_app.chat_prompt(record, chunks, user_input)
+        # 모델 이름 조회는 캐시되는 동기 코드라 스레드에서 실행
+        model_name = await run_in_threadpool(resolve_chat_model_name)
+
+        response = await agenerate(final_prompt, model_name)
+        return JSONResponse({'response': response.text})
+    except Exception as e:
+        print(f"Error Log: {e}")
+        return JSONResponse({'response': f'오류 발생: {str(e)}'}, status_code=500)
+
+
+async def views(request):
+    # 동기 라우트와 같은 커서 페이지네이션 (다음 페이지 커서는 X-Next-Cursor 헤더)
+    user_id = request.query_params.get('user_id')
+    try:
+        limit = sync_app.parse_list_limit(request.query_params.get('limit'))
+    except ValueError:
+        return JSONResponse({'error': 'limit은 숫자여야 합니다.'}, status_code=400)
+
+    try:
+        supabase = await get_async_supabase()
+        try:
+            query = sync_app.list_documents_query(supabase, user_id, request.query_params.get('cursor'), limit)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        with supabase_call('select'):
+            response = await query.execute()
+
+        rows, headers = sync_app.list_page(response.data, limit)
+        return JSONResponse(rows, headers=headers)
+    except Exception as e:
+        print(f'조회 오류: {e}')
+        return JSONResponse({'error': '문서를 찾거나 조회할 수 없습니다.'}, status_code=400)
+
+
+async def view(request):
+    file_id = request.query_params.get('id')
+    user_id = request.query_params.get('user_id')
+    try:
+        supabase = await get_async_supabase()
+        record = await _get_document(supabase, file_id)
+        if not record or str(record.get('user_id')) != str(user_id):
+            raise Exception(f"문서 없음 또는 소유자 불일치 ({file_id})")
+        return JSONResponse(record)
+    except Exception as e:
+        print(f'조회 오류: {e}')
+        return JSONResponse({'error': '문서를 찾거나 조회할 수 없습니다.'}, status_code=400)
+
+
+async def delete_document(request):
+    file_id = request.path_params['file_id']
+    user_id = request.query_params.get('user_id')
+    if not user_id:
+        return JSONResponse({'error': '유저 ID가 필요합니다.'}, status_code=400)
+
+    try:
+        supabase = await get_async_supabase()
+        with supabase_call('select'):
+            response = await supabase.table('Files').select('*').eq('id', file_id).single().execute()
+        file_data = response.data
+        if not file_data:
+            return JSONResponse({'error': '파일을 찾을 수 없습니다.'}, status_code=404)
+        if file_data['user_id'] != user_id:
+            return JSONResponse({'error': '삭제 권한이 없습니다.'}, status_code=403)
+
+        with supabase_call('delete'):
+            await supabase.table('Files').delete().eq('id', file_id).execute()
+        # Storage 파일은 동기 앱과 같은 reaper가 백그라운드에서 삭제
+        sync_app.reap_deleted([file_data])
+        return JSONResponse({'message': '삭제 성공', 'id': file_id})
+    except Exception as e:
+        print(f"❌ 삭제 중 오류: {e}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+routes = [
+    Route('/api/login', login, methods=['POST']),
+    Route('/api/chat', chat, methods=['POST']),
+    Route('/api/viewDocument', views, methods=['GET']),
+    Route('/api/viewMyDocument', view, methods=['GET']),
+    Route('/api/delete/{file_id}', delete_document, methods=['DELETE']),
+    # 그 밖의 라우트는 Flask 앱이 처리 (스레드 풀에서 실행)
+    Mount('/', app=WSGIMiddleware(sync_app.app)),
+]
+
+app = Starlette(routes=routes, middleware=[
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+               expose_headers=['X-Next-Cursor', 'Server-Timing']),
+])
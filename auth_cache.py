@@ -0,0 +1,109 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 검증 결과를 보관할 최대 토큰 수
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "10000"))
+# 서명 키(JWKS) 갱신 주기(초)
+JWKS_REFRESH_SECONDS = int(os.environ.get("JWKS_REFRESH_SECONDS", "600"))
+# Supabase 토큰의 audience
+JWT_AUDIENCE = "authenticated"
+
+
+class TokenVerifier:
+    # Supabase access token을 로컬에서 검증하고 결과를 만료 시각까지 캐시
+    # - HS256(레거시): SUPABASE_JWT_SECRET 으로 검증
+    # - 비대칭 키: /auth/v1/.well-known/jwks.json 의 공개키로 검증 (키는 주기적으로 갱신)
+    # - 알 수 없는 키이거나 로컬 검증이 불가능하면 supabase.auth.get_user 로 원격 확인
+    def __init__(self, supabase, supabase_url, jwt_secret=None, max_entries=AUTH_CACHE_SIZE):
+        self.supabase = supabase
+        self.jwt_secret = jwt_secret
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # jwt(cryptography)는 첫 검증 때 import하고 JWKS 클라이언트도 그때 만듦
+        self._jwks_url = f"{supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json" if supabase_url else None
+        self._jwks = None
+
+    def _get_jwks(self):
+        if self._jwks is None and self._jwks_url:
+            from jwt import PyJWKClient
+            with self._lock:
+                if self._jwks is None:
+                    self._jwks = PyJWKClient(self._jwks_url, cache_jwk_set=True, lifespan=JWKS_REFRESH_SECONDS)
+        return self._jwks
+
+    def _get_cached(self, token):
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims is None:
+                return None
+            if claims.get('exp', 0) <= time.time():
+                del self._cache[token]
+                return None
+            self._cache.move_to_end(token)
+            return claims
+
+    def _put(self, token, claims):
+        with self._lock:
+            self._cache[token] = claims
+            self._cache.move_to_end(token)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _verify_locally(self, token):
+        # 로컬 검증 불가(키 없음)면 None, 토큰이 잘못됐으면 jwt.InvalidTokenError
+        import jwt
+        from jwt import PyJWKClientError
+
+        header = jwt.get_unverified_header(token)
+        alg = header.get('alg')
+        if alg == 'HS256':
+            if not self.jwt_secret:
+                return None
+            return jwt.decode(token, self.jwt_secret, algorithms=['HS256'], audience=JWT_AUDIENCE)
+        jwks = self._get_jwks()
+        if jwks is None:
+            return None
+        try:
+            signing_key = jwks.get_signing_key_from_jwt(token)
+        except PyJWKClientError as e:
+            logger.info(f"서명 키를 찾지 못해 원격 검증으로 대체: {e}")
+            return None
+        return jwt.decode(token, signing_key.key, algorithms=[alg], audience=JWT_AUDIENCE)
+
+    def _verify_remotely(self, token):
+        import jwt
+
+        user = self.supabase.auth.get_user(token)
+        if not user or not user.user:
+            return None
+        unverified = jwt.decode(token, options={"verify_signature": False})
+        return {
+            'sub': user.user.id,
+            'email': user.user.email,
+            'user_metadata': user.user.user_metadata or {},
+            'exp': unverified.get('exp', time.time() + 60),
+        }
+
+    def verify(self, token):
+        # 유효하면 claims(dict) 반환, 아니면 None
+        import jwt
+
+        claims = self._get_cached(token)
+        if claims is not None:
+            return claims
+        try:
+            claims = self._verify_locally(token)
+        except jwt.InvalidTokenError as e:
+            logger.info(f"토큰 검증 실패: {e}")
+            return None
+        if claims is None:
+            claims = self._verify_remotely(token)
+        if claims:
+            self._put(token, claims)
+        return claims
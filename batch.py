@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+# 오프라인 일괄 처리: 디렉터리 안의 PDF를 텍스트 추출 → 요약(HTML) → 번역
+#
+#   python batch.py papers/ --output out/ --workers 8 --gemini-concurrency 4 --translate-workers 2
+#
+# 추출은 프로세스 풀, 요약은 Gemini 동시 요청 수만큼의 스레드, 번역은 pdf2zh 워커 프로세스에서 실행
+# 결과 폴더의 manifest.json에 파일별 단계 상태를 기록하고, 다시 실행하면 끝난 단계는 건너뜀
+# (파일 내용이 바뀌었으면 그 파일은 처음부터 다시 처리)
+
+logger = logging.getLogger("batch")
+
+MANIFEST_NAME = "manifest.json"
+STEPS = ("extract", "summary", "translate")
+
+DONE = "done"
+FAILED = "failed"
+
+# app.py와 같은 번역 기본값
+DEFAULT_LANG_IN = "en"
+DEFAULT_LANG_OUT = "ko"
+DEFAULT_PROMPT = "전문 용어 제외하고 한국어로 번역. 코드나 논문 제목은 원문 유지."
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 디렉터리 일괄 요약/번역")
+    parser.add_argument("input_dir", help="PDF가 들어 있는 디렉터리 (하위 디렉터리 포함)")
+    parser.add_argument("--output", help="결과 디렉터리 (기본: <input_dir>/_batch)")
+    parser.add_argument("--steps", default=",".join(STEPS), help="실행할 단계 (쉼표 구분: extract,summary,translate)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="텍스트 추출 프로세스 수")
+    parser.add_argument("--gemini-concurrency", type=int,
+                        default=int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4")),
+                        help="프로세스당 동시 Gemini 요청 수 상한 (분당 요청 수는 GEMINI_RPM)")
+    parser.add_argument("--translate-workers", type=int,
+                        default=int(os.environ.get("TRANSLATE_WORKERS", "1")), help="pdf2zh 워커 프로세스 수")
+    parser.add_argument("--translate-timeout", type=int, default=3600, help="문서 하나의 번역 제한 시간(초)")
+    parser.add_argument("--backend", default="pymupdf", choices=("pymupdf", "pypdf"), help="텍스트 추출 백엔드")
+    parser.add_argument("--combined", action="store_true", help="요약/설명을 요청 한 번으로 받기")
+    parser.add_argument("--lang-in", default=DEFAULT_LANG_IN)
+    parser.add_argument("--lang-out", default=DEFAULT_LANG_OUT)
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="번역 프롬프트")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------------
+# 진행 상황 기록 (다시 실행할 때 끝난 단계 건너뛰기)
+# ---------------------------------------------------------
+class Manifest:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def prepare(self, key, sha256):
+        # 내용이 바뀐 파일은 기록을 지우고 처음부터
+        with self._lock:
+            entry = self.files.get(key)
+            if entry is None or entry.get("sha256") != sha256:
+                self.files[key] = {"sha256": sha256, "steps": {}}
+
+    def is_done(self, key, step):
+        with self._lock:
+            return self.files[key]["steps"].get(step, {}).get("status") == DONE
+
+    def mark(self, key, step, status, **info):
+        with self._lock:
+            self.files[key]["steps"][step] = {"status": status, "at": time.strftime("%Y-%m-%dT%H:%M:%S"), **info}
+            self._save()
+
+    def _save(self):
+        # 중간에 종료돼도 manifest가 깨지지 않도록 임시 파일에 쓰고 교체
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+# ---------------------------------------------------------
+# 단계별 작업
+# ---------------------------------------------------------
+def _extract(pdf_path, text_path, backend):
+    # 추출 프로세스에서 실행: 페이지 텍스트를 바로 파일에 써서 문서 전체를 메모리에 모으지 않음
+    # (이미 프로세스 풀 안이라 pdf_extract 자체의 병렬 추출은 끔)
+    from pdf_extract import iter_pages
+
+    started = time.perf_counter()
+    pages = 0
+    temp_path = text_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for text in iter_pages(pdf_path, backend=backend, workers=1):
+            if text:
+                f.write(text)
+                f.write("\n\n")
+            pages += 1
+    os.replace(temp_path, text_path)
+    return {"pages": pages, "seconds": round(time.perf_counter() - started, 2)}
+
+
+def _summarize(title, text_path, html_path, combined):
+    from summarize import summarize_document
+    from summary_html import render_summary_html
+
+    with open(text_path, encoding="utf-8") as f:
+        text = f.read()
+    summary, understand = summarize_document(text, combined=combined)
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(render_summary_html(title, summary, understand))
+
+
+def _translate(pdf_path, output_path, work_base, args):
+    from translator import translation_pool, remove_output_dir
+
+    work_dir = translation_pool.make_output_dir(work_base, os.getpid())
+    try:
+        mono_path = translation_pool.translate(pdf_path, work_dir, args.lang_in, args.lang_out,
+                                               prompt_text=args.prompt, timeout=args.translate_timeout)
+        shutil.move(mono_path, output_path)
+    finally:
+        remove_output_dir(work_dir)
+
+
+# ---------------------------------------------------------
+# 실행
+# ---------------------------------------------------------
+def find_pdfs(input_dir, output_dir):
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        # 결과 디렉터리가 입력 안에 있으면 건너뜀
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != output_dir)
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.join(root, name))
+    return found
+
+
+class BatchRun:
+    def __init__(self, args, output_dir, steps):
+        self.args = args
+        self.output_dir = output_dir
+        self.steps = steps
+        self.manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+        self.work_dir = os.path.join(output_dir, ".work")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.counts = {DONE: 0, FAILED: 0, "skipped": 0}
+        self._counts_lock = threading.Lock()
+
+        ctx = multiprocessing.get_context("spawn")
+        self.extract_pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx)
+        self.summary_pool = ThreadPoolExecutor(max_workers=args.gemini_concurrency, thread_name_prefix="summary")
+        # 번역은 워커 프로세스에서 돌고, 여기서는 결과를 기다리는 스레드만 둠
+        self.translate_pool = ThreadPoolExecutor(max_workers=args.translate_workers, thread_name_prefix="translate")
+
+    def _count(self, status):
+        with self._counts_lock:
+            self.counts[status] += 1
+
+    def _outputs(self, key):
+        stem = os.path.join(self.output_dir, os.path.splitext(key)[0])
+        os.makedirs(os.path.dirname(stem), exist_ok=True)
+        return {
+            "text": stem + ".txt",
+            "summary": stem + ".summary.html",
+            "translate": f"{stem}.{self.args.lang_out}.pdf",
+        }
+
+    def _run_step(self, key, step, fn, *fn_args, **info):
+        started = time.perf_counter()
+        try:
+            result = fn(*fn_args)
+        except Exception as e:
+            logger.error(f"❌ {key} {step} 실패: {e}")
+            self.manifest.mark(key, step, FAILED, error=str(e))
+            self._count(FAILED)
+            return False
+        # 작업이 다른 프로세스에서 돌았으면 거기서 잰 시간(seconds)을 씀
+        info = {"seconds": round(time.perf_counter() - started, 2), **info, **(result or {})}
+        self.manifest.mark(key, step, DONE, **info)
+        self._count(DONE)
+        logger.info(f"✅ {key} {step} ({info['seconds']}s)")
+        return True
+
+    def submit(self, pdf_path):
+        from dedup import file_sha256
+
+        key = os.path.relpath(pdf_path, self.args.input_dir)
+        self.manifest.prepare(key, file_sha256(pdf_path))
+        outputs = self._outputs(key)
+
+        # 번역은 추출 결과가 필요 없으므로 바로 시작
+        if "translate" in self.steps:
+            if self.manifest.is_done(key, "translate"):
+                self._count("skipped")
+            else:
+                self.translate_pool.submit(self._run_step, key, "translate", _translate,
+                                           pdf_path, outputs["translate"], self.work_dir, self.args,
+                                           output=outputs["translate"])
+
+        need_summary = "summary" in self.steps and not self.manifest.is_done(key, "summary")
+        if "summary" in self.steps and not need_summary:
+            self._count("skipped")
+        if "extract" in self.steps or need_summary:
+            if self.manifest.is_done(key, "extract") and os.path.exists(outputs["text"]):
+                if "extract" in self.steps:
+                    self._count("skipped")
+                if need_summary:
+                    self._submit_summary(key, outputs)
+                return
+            future = self.extract_pool.submit(_extract, pdf_path, outputs["text"], self.args.backend)
+            future.add_done_callback(lambda f: self._after_extract(f, key, outputs, need_summary))
+
+    def _after_extract(self, future, key, outputs, need_summary):
+        if not self._run_step(key, "extract", future.result, output=outputs["text"]):
+            return
+        if need_summary:
+            self._submit_summary(key, outputs)
+
+    def _submit_summary(self, key, outputs):
+        title = os.path.splitext(os.path.basename(key))[0]
+        self.summary_pool.submit(self._run_step, key, "summary", _summarize,
+                                 title, outputs["text"], outputs["summary"], self.args.combined,
+                                 output=outputs["summary"])
+
+    def wait(self):
+        # 추출이 끝나야 요약이 모두 등록되므로 순서대로 종료
+        self.extract_pool.shutdown(wait=True)
+        self.summary_pool.shutdown(wait=True)
+        self.translate_pool.shutdown(wait=True)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    load_dotenv()
+
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    unknown = [s for s in steps if s not in STEPS]
+    if unknown:
+        print(f"알 수 없는 단계: {', '.join(unknown)}")
+        return 2
+
+    # Gemini 동시 요청 수와 번역 워커 수는 모듈을 import할 때 읽히므로 먼저 설정
+    # (GEMINI_RPM은 이 메인 프로세스 하나와 번역 워커들이 GEMINI_TRANSLATE_SHARE 비율로 나눠 씀)
+    os.environ["GEMINI_MAX_CONCURRENCY"] = str(args.gemini_concurrency)
+    os.environ["TRANSLATE_WORKERS"] = str(args.translate_workers)
+    os.environ["WEB_CONCURRENCY"] = "1"
+
+    args.input_dir = os.path.abspath(args.input_dir)
+    output_dir = os.path.abspath(args.output or os.path.join(args.input_dir, "_batch"))
+    os.makedirs(output_dir, exist_ok=True)
+
+    pdfs = find_pdfs(args.input_dir, output_dir)
+    if not pdfs:
+        print(f"PDF 파일이 없습니다: {args.input_dir}")
+        return 0
+    logger.info(f"📚 PDF {len(pdfs)}개, 단계: {', '.join(steps)}, 결과: {output_dir}")
+
+    started = time.perf_counter()
+    run = BatchRun(args, output_dir, steps)
+    try:
+        for pdf_path in pdfs:
+            run.submit(pdf_path)
+        run.wait()
+    finally:
+        if "translate" in steps:
+            from translator import translation_pool
+            translation_pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"🏁 완료 {run.counts[DONE]}, 실패 {run.counts[FAILED]}, 건너뜀 {run.counts['skipped']} "
+                f"({elapsed:.1f}s)")
+    return 1 if run.counts[FAILED] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import random
+
+# 벤치마크용 PDF 생성 (페이지 수가 다른 문서 묶음)
+_WORDS = (
+    "model data training attention layer network result method evaluation baseline "
+    "transformer token sequence loss gradient optimization dataset benchmark accuracy "
+    "experiment parameter encoder decoder retrieval translation summary document analysis"
+).split()
+
+
+def _paragraph(rng, words):
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def make_pdf(pages, seed, words_per_page=350):
+    # 내용이 문서마다 달라야 중복 업로드 재사용에 걸리지 않음 (seed를 첫 줄에 넣음)
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    try:
+        for number in range(pages):
+            page = doc.new_page()
+            body = "\n\n".join(_paragraph(rng, words_per_page // 5) for _ in range(5))
+            text = f"Benchmark document {seed} - page {number + 1}\n\n{body}"
+            page.insert_textbox(fitz.Rect(50, 50, page.rect.width - 50, page.rect.height - 50),
+                                text, fontsize=9)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def make_corpus(sizes, per_size, prefix="bench"):
+    # [(파일명, 페이지 수, PDF bytes)]
+    corpus = []
+    for pages in sizes:
+        for i in range(per_size):
+            seed = f"{prefix}-{pages}p-{i}"
+            corpus.append((f"{seed}.pdf", pages, make_pdf(pages, seed)))
+    return corpus
@@ -0,0 +1,376 @@
+import os
+import sys
+import copy
+import json
+import time
+import types
+import zlib
+import shutil
+import random
+import itertools
+import threading
+from datetime import datetime, timezone, timedelta
+
+# 벤치마크용 가짜 외부 서비스 (Supabase, Gemini, pdf2zh 번역)
+# 네트워크 없이 같은 코드 경로를 타도록 실제 클라이언트의 메서드 모양만 흉내냄
+
+
+class Latency:
+    # 호출마다 평균 base초, ±jitter 비율만큼 흔들리는 지연
+    def __init__(self, base, jitter=0.2):
+        self.base = base
+        self.jitter = jitter
+
+    def sleep(self, scale=1.0):
+        if self.base <= 0:
+            return
+        delay = self.base * scale * random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(delay)
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+# ---------------------------------------------------------
+# Supabase: 테이블(PostgREST), Storage, Auth
+# ---------------------------------------------------------
+class FakeDatabase:
+    def __init__(self, latency):
+        self.latency = latency
+        self.tables = {}
+        self._ids = itertools.count(1)
+        self._clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self._lock = threading.Lock()
+
+    def insert(self, table, rows):
+        with self._lock:
+            inserted = []
+            for row in rows:
+                row = dict(row)
+                row.setdefault('id', next(self._ids))
+                self._clock += timedelta(milliseconds=1)
+                row.setdefault('created_at', self._clock.isoformat())
+                self.tables.setdefault(table, []).append(row)
+                inserted.append(copy.deepcopy(row))
+            return inserted
+
+
+class _Filter:
+    def __init__(self, column, op, value, negate=False):
+        self.column = column
+        self.op = op
+        self.value = value
+        self.negate = negate
+
+    def matches(self, row):
+        current = row.get(self.column)
+        if self.op == 'eq':
+            result = str(current) == str(self.value)
+        elif self.op == 'neq':
+            result = str(current) != str(self.value)
+        elif self.op == 'is':
+            result = current is None if self.value in (None, 'null') else current == self.value
+        elif self.op == 'in':
+            result = str(current) in {str(v) for v in self.value}
+        else:
+            raise NotImplementedError(self.op)
+        return not result if self.negate else result
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = 'select'
+        self.columns = '*'
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.limit_count = None
+        self.single_row = False
+        self._negate_next = False
+
+    # 동작
+    def select(self, columns='*', **_):
+        self.columns = columns
+        return self
+
+    def insert(self, data, **_):
+        self.action, self.payload = 'insert', data
+        return self
+
+    def update(self, data, **_):
+        self.action, self.payload = 'update', data
+        return self
+
+    def delete(self, **_):
+        self.action = 'delete'
+        return self
+
+    # 조건
+    def _add(self, column, op, value):
+        self.filters.append(_Filter(column, op, value, self._negate_next))
+        self._negate_next = False
+        return self
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def eq(self, column, value):
+        return self._add(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._add(column, 'neq', value)
+
+    def is_(self, column, value):
+        return self._add(column, 'is', value)
+
+    def in_(self, column, values):
+        return self._add(column, 'in', list(values))
+
+    def or_(self, expression):
+        # 커서 페이지네이션 조건은 벤치마크에서 첫 페이지만 조회하므로 무시
+        return self
+
+    def order(self, column, desc=False, **_):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def _project(self, row):
+        if self.columns.strip() == '*':
+            return copy.deepcopy(row)
+        return {c.strip(): copy.deepcopy(row.get(c.strip())) for c in self.columns.split(',')}
+
+    def execute(self):
+        self.db.latency.sleep()
+        if self.action == 'insert':
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            return _Result(self.db.insert(self.table, rows))
+
+        with self.db._lock:
+            table = self.db.tables.setdefault(self.table, [])
+            matched = [row for row in table if all(f.matches(row) for f in self.filters)]
+            if self.action == 'update':
+                for row in matched:
+                    row.update(self.payload)
+                return _Result([copy.deepcopy(row) for row in matched])
+            if self.action == 'delete':
+                removed = {id(row) for row in matched}
+                self.db.tables[self.table] = [row for row in table if id(row) not in removed]
+                return _Result([copy.deepcopy(row) for row in matched])
+
+            for column, desc in reversed(self.orders):
+                matched.sort(key=lambda row: str(row.get(column)), reverse=desc)
+            if self.limit_count is not None:
+                matched = matched[:self.limit_count]
+            rows = [self._project(row) for row in matched]
+        if self.single_row:
+            if len(rows) != 1:
+                raise Exception(f"단일 행 조회 결과가 {len(rows)}개입니다.")
+            return _Result(rows[0])
+        return _Result(rows)
+
+
+class FakeStorage:
+    def __init__(self, latency, base_url):
+        self.latency = latency
+        self.base_url = base_url
+        self.objects = {}
+        self._lock = threading.Lock()
+
+    def from_(self, bucket):
+        return _FakeBucket(self, bucket)
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(len(v) for v in self.objects.values())
+
+
+class _FakeBucket:
+    def __init__(self, storage, bucket):
+        self.storage = storage
+        self.bucket = bucket
+
+    def upload(self, path, file, file_options=None):
+        if isinstance(file, (bytes, bytearray, memoryview)):
+            data = bytes(file)
+        elif isinstance(file, (str, os.PathLike)):
+            with open(file, 'rb') as f:
+                data = f.read()
+        else:
+            data = file.read()
+        # 전송 시간은 크기에 비례 (MB당 기본 지연 1배 추가)
+        self.storage.latency.sleep(1 + len(data) / (1024 * 1024))
+        with self.storage._lock:
+            self.storage.objects[(self.bucket, path)] = data
+        return {'Key': f"{self.bucket}/{path}"}
+
+    def download(self, path):
+        self.storage.latency.sleep()
+        with self.storage._lock:
+            data = self.storage.objects.get((self.bucket, path))
+        if data is None:
+            raise Exception(f"Object not found: {path}")
+        return data
+
+    def remove(self, paths):
+        self.storage.latency.sleep()
+        with self.storage._lock:
+            for path in paths:
+                self.storage.objects.pop((self.bucket, path), None)
+        return [{'name': p} for p in paths]
+
+    def get_public_url(self, path):
+        return f"{self.storage.base_url}/storage/v1/object/public/{self.bucket}/{path}"
+
+
+class FakeAuth:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def _user(self, email='bench@example.com'):
+        return types.SimpleNamespace(id='bench-user', email=email, user_metadata={'client_name': 'bench'})
+
+    def sign_in_with_password(self, credentials):
+        self.latency.sleep()
+        return types.SimpleNamespace(
+            user=self._user(credentials.get('email')),
+            session=types.SimpleNamespace(access_token='bench-token'),
+        )
+
+    def sign_up(self, credentials):
+        self.latency.sleep()
+        return types.SimpleNamespace(user=self._user(credentials.get('email')))
+
+    def get_user(self, token):
+        self.latency.sleep()
+        return types.SimpleNamespace(user=self._user())
+
+
+class FakeSupabase:
+    def __init__(self, url, latency):
+        self.db = FakeDatabase(latency)
+        self.storage = FakeStorage(latency, url)
+        self.auth = FakeAuth(latency)
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+
+# ---------------------------------------------------------
+# Gemini (google.generativeai)
+# ---------------------------------------------------------
+def _fake_text(prompt, json_mode):
+    words = len(str(prompt).split())
+    body = f"# 요약\n- 입력 {words}단어에 대한 벤치마크 응답\n- **핵심** 내용"
+    if json_mode:
+        return json.dumps({"summary": body, "understand": body}, ensure_ascii=False)
+    return body
+
+
+class _FakeResponse:
+    def __init__(self, text, prompt_tokens):
+        self.text = text
+        self.usage_metadata = types.SimpleNamespace(
+            prompt_token_count=prompt_tokens, candidates_token_count=len(text) // 4
+        )
+
+
+class FakeGenerativeModel:
+    latency = Latency(0.0)
+
+    def __init__(self, model_name, **_):
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **_):
+        # 입력이 길수록 조금 더 오래 걸리도록 (1만 토큰당 기본 지연 1배 추가)
+        prompt_tokens = len(str(prompt)) // 4
+        self.latency.sleep(1 + prompt_tokens / 10000)
+        json_mode = bool(generation_config) and generation_config.get("response_mime_type") == "application/json"
+        response = _FakeResponse(_fake_text(prompt, json_mode), prompt_tokens)
+        if not stream:
+            return response
+        return iter([_FakeResponse(part, 0) for part in response.text.split("\n")])
+
+
+def _embed_content(model, content, task_type=None, **_):
+    FakeGenerativeModel.latency.sleep()
+
+    def vector(text):
+        rng = random.Random(zlib.crc32(text.encode("utf-8")))
+        return [rng.uniform(-1, 1) for _ in range(32)]
+
+    if isinstance(content, list):
+        return {'embedding': [vector(t) for t in content]}
+    return {'embedding': vector(content)}
+
+
+def _list_models():
+    return [types.SimpleNamespace(name='models/gemini-bench', supported_generation_methods=['generateContent'])]
+
+
+def make_genai_module():
+    module = types.ModuleType('google.generativeai')
+    module.configure = lambda **_: None
+    module.GenerativeModel = FakeGenerativeModel
+    module.embed_content = _embed_content
+    module.list_models = _list_models
+    return module
+
+
+# ---------------------------------------------------------
+# 설치
+# ---------------------------------------------------------
+def install(supabase_latency=0.01, gemini_latency=0.2, jitter=0.2):
+    # app을 import하기 전에 호출: supabase / google.generativeai 모듈을 가짜로 교체
+    base_url = os.environ.setdefault("SUPABASE_URL", "http://supabase.bench.local")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench-service-key")
+    os.environ.setdefault("GEMINI_API_KEY", "bench-gemini-key")
+
+    client = FakeSupabase(base_url, Latency(supabase_latency, jitter))
+    supabase_module = types.ModuleType('supabase')
+    supabase_module.Client = FakeSupabase
+    supabase_module.create_client = lambda url, key, *a, **kw: client
+    sys.modules['supabase'] = supabase_module
+
+    FakeGenerativeModel.latency = Latency(gemini_latency, jitter)
+    genai = make_genai_module()
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType('google')
+        google.__path__ = []
+        sys.modules['google'] = google
+    google.generativeai = genai
+    sys.modules['google.generativeai'] = genai
+    return client
+
+
+def stub_translation(pool, seconds_per_page=0.05, jitter=0.2):
+    # pdf2zh 워커 대신 원본을 그대로 복사하는 번역 (페이지 수에 비례한 지연)
+    latency = Latency(seconds_per_page, jitter)
+
+    def translate(input_path, output_dir, lang_in="en", lang_out="ko", prompt_text=None, **_):
+        import fitz
+        with fitz.open(input_path) as doc:
+            pages = doc.page_count
+        latency.sleep(pages)
+        stem = os.path.splitext(os.path.basename(input_path))[0]
+        mono_path = os.path.join(output_dir, f"{stem}-mono.pdf")
+        shutil.copyfile(input_path, mono_path)
+        return mono_path
+
+    pool.translate = translate
+    pool.warm_up = lambda: None
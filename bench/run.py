@@ -0,0 +1,358 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# 오프라인 벤치마크: 가짜 Supabase/Gemini/번역으로 Flask 라우트를 실제 코드 경로 그대로 호출
+#
+#   python -m bench.run --sizes 1,10,40 --per-size 3 --output bench/results/$(git rev-parse --short HEAD).json
+#   python -m bench.run --compare bench/results/<이전 커밋>.json
+#
+# 결과 JSON에는 커밋, 설정, 라우트/단계별 지연 백분위, 처리량, 최대 메모리가 들어감
+# 같은 설정으로 돌린 결과끼리 비교해야 의미가 있음
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from bench import fakes  # noqa: E402
+from bench.corpus import make_corpus  # noqa: E402
+
+BENCH_USER = "bench-user"
+
+# 깨끗한 프로세스에서 app을 import하고 시작 상태를 JSON으로 출력
+# (벤치 프로세스는 fakes가 sys.modules를 미리 채워 두므로 지연 로드 여부를 제대로 볼 수 없음)
+STARTUP_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+import app
+import_seconds = time.perf_counter() - started
+from memory_guard import current_rss_mb
+report = app.import_profile.startup_report()
+print(json.dumps({"import_seconds": import_seconds, "idle_rss_mb": current_rss_mb(),
+                  "lazy_loaded": report["lazy_loaded"], "imports": report["imports"]}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="document-back 오프라인 벤치마크")
+    parser.add_argument("--sizes", default="1,10,40", help="문서 페이지 수 목록 (쉼표 구분)")
+    parser.add_argument("--per-size", type=int, default=2, help="페이지 수마다 만들 문서 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 보내는 요청 수")
+    parser.add_argument("--chat-requests", type=int, default=20)
+    parser.add_argument("--view-requests", type=int, default=50)
+    parser.add_argument("--gemini-latency", type=float, default=0.2, help="Gemini 호출당 기본 지연(초)")
+    parser.add_argument("--supabase-latency", type=float, default=0.01, help="Supabase 호출당 기본 지연(초)")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="번역 페이지당 지연(초)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="지연 흔들림 비율")
+    parser.add_argument("--job-timeout", type=float, default=600, help="업로드 작업 하나의 최대 대기 시간(초)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (없으면 표준 출력)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="비교 시 p95/처리량이 이 비율 이상 나빠지면 종료 코드 1")
+    return parser.parse_args(argv)
+
+
+# ---------------------------------------------------------
+# 측정 도구
+# ---------------------------------------------------------
+class MemorySampler:
+    # 프로세스(+자식) RSS 최대치를 주기적으로 측정
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bench-memory", daemon=True)
+
+    def _run(self):
+        from memory_guard import current_rss_mb
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return round(self.peak_mb, 1)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies, errors, elapsed):
+    ms = [v * 1000 for v in latencies]
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed > 0 else None,
+        **{f"p{p}_ms": round(percentile(ms, p), 1) if ms else None for p in (50, 90, 95, 99)},
+        "max_ms": round(max(ms), 1) if ms else None,
+    }
+
+
+def run_concurrently(fn, items, concurrency):
+    # fn(item) -> (소요 시간 또는 None, 부가 결과)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(fn, items))
+    elapsed = time.perf_counter() - started
+    latencies = [o[0] for o in outcomes if o[0] is not None]
+    errors = sum(1 for o in outcomes if o[0] is None)
+    return summarize_latencies(latencies, errors, elapsed), [o[1] for o in outcomes]
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except Exception:
+        return None, None
+
+
+# ---------------------------------------------------------
+# 시나리오
+# ---------------------------------------------------------
+def bench_uploads(app, corpus, concurrency, job_timeout):
+    # 업로드 요청 접수 시간과 작업 완료까지의 시간을 따로 기록
+    accept = []
+
+    def upload(item):
+        name, pages, pdf = item
+        client = app.test_client()
+        started = time.perf_counter()
+        response = client.post('/api/upload', data={
+            'file': (io.BytesIO(pdf), name),
+            'user_id': BENCH_USER,
+        }, content_type='multipart/form-data')
+        accept.append(time.perf_counter() - started)
+        if response.status_code not in (200, 202):
+            return None, None
+        body = response.get_json()
+        if 'job_id' not in body:
+            return time.perf_counter() - started, {"file_id": body.get("file_id"), "stages": []}
+
+        deadline = time.monotonic() + job_timeout
+        while time.monotonic() < deadline:
+            job = client.get(f"/api/jobs/{body['job_id']}").get_json()
+            if job['status'] in ('success', 'failed'):
+                ok = job['status'] == 'success' and job['result'].get('translate_status') == 'success'
+                elapsed = time.perf_counter() - started
+                return (elapsed if ok else None), {"file_id": job['result'].get('file_id'),
+                                                   "pages": pages, "stages": job['stages']}
+            time.sleep(0.05)
+        return None, None
+
+    pipeline, outcomes = run_concurrently(upload, corpus, concurrency)
+    outcomes = [o for o in outcomes if o]
+
+    # 단계별 소요 시간 분포
+    stage_times = {}
+    for outcome in outcomes:
+        for stage in outcome["stages"]:
+            if stage.get("started_at") and stage.get("finished_at"):
+                stage_times.setdefault(stage["name"], []).append(stage["finished_at"] - stage["started_at"])
+    stages = {name: summarize_latencies(values, 0, 0) for name, values in stage_times.items()}
+    for stats in stages.values():
+        stats.pop("throughput_per_s")
+        stats.pop("errors")
+
+    accept_stats = summarize_latencies(accept, 0, 0)
+    accept_stats.pop("throughput_per_s")
+    file_ids = [o["file_id"] for o in outcomes if o.get("file_id")]
+    return {"upload_accept": accept_stats, "upload_pipeline": pipeline}, stages, file_ids
+
+
+def bench_views(app, requests, concurrency):
+    def view(_):
+        started = time.perf_counter()
+        response = app.test_client().get(f"/api/viewDocument?user_id={BENCH_USER}&limit=50")
+        return (time.perf_counter() - started if response.status_code == 200 else None), None
+
+    stats, _ = run_concurrently(view, range(requests), concurrency)
+    return stats
+
+
+def bench_chat(app, file_ids, requests, concurrency):
+    def chat(i):
+        started = time.perf_counter()
+        response = app.test_client().post('/api/chat', json={
+            # 같은 질문은 gemini_client에서 합쳐지므로 질문을 매번 다르게
+            'message': f"벤치마크 질문 {i}: 이 문서의 핵심 결과는 무엇인가요?",
+            'file_id': file_ids[i % len(file_ids)],
+        })
+        return (time.perf_counter() - started if response.status_code == 200 else None), None
+
+    stats, _ = run_concurrently(chat, range(requests), concurrency)
+    return stats
+
+
+def bench_deletes(app, file_ids, concurrency):
+    def delete(file_id):
+        started = time.perf_counter()
+        response = app.test_client().delete(f"/api/delete/{file_id}?user_id={BENCH_USER}")
+        return (time.perf_counter() - started if response.status_code == 200 else None), None
+
+    stats, _ = run_concurrently(delete, file_ids, concurrency)
+    return stats
+
+
+def bench_bulk_delete(app, file_ids):
+    # 한 번의 요청으로 여러 문서 삭제 (Storage 정리는 백그라운드)
+    def delete(ids):
+        started = time.perf_counter()
+        response = app.test_client().post('/api/delete', json={"user_id": BENCH_USER, "ids": ids})
+        return (time.perf_counter() - started if response.status_code == 200 else None), None
+
+    stats, _ = run_concurrently(delete, [file_ids], 1)
+    return stats
+
+
+# ---------------------------------------------------------
+# 비교
+# ---------------------------------------------------------
+def compare(current, baseline, threshold):
+    # p95는 커지면, 처리량은 작아지면 나빠진 것
+    regressions = []
+    print(f"{'항목':<28}{'이전':>12}{'현재':>12}{'변화':>10}")
+    for name, stats in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for field, worse_if_higher in (("p95_ms", True), ("throughput_per_s", False)):
+            old, new = before.get(field), stats.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            print(f"{name + '.' + field:<28}{old:>12}{new:>12}{change:>+10.1%}")
+            if (change > threshold) if worse_if_higher else (change < -threshold):
+                regressions.append(f"{name}.{field}")
+    # 콜드 스타트/메모리는 커지면 나빠진 것
+    totals = [("peak_rss_mb", baseline.get("peak_rss_mb"), current.get("peak_rss_mb"))]
+    for field in ("import_seconds", "idle_rss_mb"):
+        totals.append((f"startup.{field}", baseline.get("startup", {}).get(field),
+                       current.get("startup", {}).get(field)))
+    for name, old, new in totals:
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        print(f"{name:<28}{old:>12}{new:>12}{change:>+10.1%}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def measure_startup(work_dir):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT_DIR, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=work_dir, env=env,
+                          capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise RuntimeError(f"시작 측정 실패:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    # 작업 디렉터리를 바꾸기 전에 경로를 절대 경로로
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+
+    # temp_pdfs, 번역 메모리 DB 등은 임시 작업 디렉터리에 생성
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    os.chdir(work_dir)
+    os.environ.setdefault("TRANSLATION_MEMORY_PATH", os.path.join(work_dir, "translation_memory.db"))
+
+    # import 직후 상태 (지연 로드가 깨지면 lazy_loaded에 나타남)
+    startup = measure_startup(work_dir)
+
+    fakes.install(args.supabase_latency, args.gemini_latency, args.jitter)
+    sampler = MemorySampler().start()
+    import app as app_module
+
+    # 콜드 스타트 후 첫 요청 (헬스 체크 라우트)
+    first_started = time.perf_counter()
+    app_module.app.test_client().get('/')
+    first_request_seconds = time.perf_counter() - first_started
+
+    fakes.stub_translation(app_module.translation_pool, args.translate_latency, args.jitter)
+    app = app_module.app
+
+    corpus = make_corpus(sizes, args.per_size)
+    run_started = time.perf_counter()
+    scenarios, stages, file_ids = bench_uploads(app, corpus, args.concurrency, args.job_timeout)
+    scenarios["view_document"] = bench_views(app, args.view_requests, args.concurrency)
+    if file_ids:
+        scenarios["chat"] = bench_chat(app, file_ids, args.chat_requests, args.concurrency)
+        # 절반은 한 건씩, 나머지는 일괄 삭제
+        half = len(file_ids) // 2
+        scenarios["delete"] = bench_deletes(app, file_ids[:half], args.concurrency)
+        scenarios["bulk_delete"] = bench_bulk_delete(app, file_ids[half:])
+    total_seconds = time.perf_counter() - run_started
+
+    commit, dirty = git_commit()
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold")},
+        "corpus": {"documents": len(corpus), "pages": sum(p for _, p, _ in corpus),
+                   "bytes": sum(len(b) for _, _, b in corpus)},
+        "startup": {
+            "import_seconds": round(startup["import_seconds"], 3),
+            "first_request_ms": round(first_request_seconds * 1000, 1),
+            "idle_rss_mb": round(startup["idle_rss_mb"], 1),
+            "lazy_loaded": startup["lazy_loaded"],
+            "slowest_imports": startup["imports"][:10],
+        },
+        "total_seconds": round(total_seconds, 2),
+        "scenarios": scenarios,
+        "stages": stages,
+        "peak_rss_mb": sampler.stop(),
+    }
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if output:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"❌ 성능 저하: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+# 문서 행(Files) 캐시: 최대 크기(MB)와 유지 시간(초)
+RECORD_CACHE_MB = int(os.environ.get("RECORD_CACHE_MB", "32"))
+RECORD_CACHE_TTL = int(os.environ.get("RECORD_CACHE_TTL", "300"))
+# 채팅 검색 인덱스(청크 + 임베딩) 캐시
+CHAT_CONTEXT_CACHE_MB = int(os.environ.get("CHAT_CONTEXT_CACHE_MB", "128"))
+CHAT_CONTEXT_CACHE_TTL = int(os.environ.get("CHAT_CONTEXT_CACHE_TTL", "3600"))
+
+
+def estimate_size(value):
+    # 대략적인 메모리 사용량(바이트). 문자열/리스트/딕셔너리는 내용까지 합산
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class SizedTTLCache:
+    # 크기 제한이 있는 LRU 캐시 + 항목별 만료 시간
+    # 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 제거
+    def __init__(self, name, max_bytes, ttl, size_fn=estimate_size):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_fn = size_fn
+        self._items = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # invalidate할 때마다 증가 (읽어오는 도중 무효화된 값을 다시 넣지 않도록)
+        self._generation = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[2] <= time.monotonic():
+                self._remove(key)
+                item = None
+            if item is None:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return item[0]
+
+    def set(self, key, value, generation=None):
+        # generation: 읽기 시작할 때의 세대, 그 사이 무효화가 있었으면 저장하지 않음
+        size = self.size_fn(value)
+        if size > self.max_bytes:
+            # 너무 큰 값은 저장하지 않음 (예전 값이 남아 있지 않게 제거)
+            self.invalidate(key)
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def get_or_load(self, key, loader):
+        # 없으면 loader()로 채움 (None 결과는 저장하지 않음)
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = loader()
+            if value is not None:
+                self.set(key, value, generation)
+        return value
+
+    async def aget_or_load(self, key, loader):
+        # get_or_load의 비동기 버전 (loader는 코루틴 함수), 기다리는 동안 무효화되면 저장하지 않음
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = await loader()
+            if value is not None:
+                self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            if key in self._items:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._items.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+            }
+
+
+# Files 행 (file_id -> 전체 행)
+record_cache = SizedTTLCache("records", RECORD_CACHE_MB * 1024 * 1024, RECORD_CACHE_TTL)
+# 채팅 검색 인덱스 (content_hash -> DocumentIndex), 크기는 DocumentIndex.size_bytes()
+chat_context_cache = SizedTTLCache(
+    "chat_context", CHAT_CONTEXT_CACHE_MB * 1024 * 1024, CHAT_CONTEXT_CACHE_TTL,
+    size_fn=lambda index: index.size_bytes(),
+)
+
+
+def invalidate_document(file_id, content_hash=None):
+    # 문서가 바뀌거나 삭제됐을 때 호출
+    record_cache.invalidate(str(file_id))
+    if content_hash:
+        chat_context_cache.invalidate(content_hash)
+
+
+def all_stats():
+    return {cache.name: cache.stats() for cache in (record_cache, chat_context_cache)}
@@ -0,0 +1,58 @@
+import os
+import asyncio
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+_supabase = None
+_supabase_lock = threading.Lock()
+
+_async_supabase = None
+_async_supabase_lock = None
+
+
+def get_supabase():
+    # 프로세스 전체에서 하나만 쓰는 Supabase 클라이언트 (첫 사용 때 생성)
+    # 같은 클라이언트를 공유해야 PostgREST/Storage의 HTTP 연결이 재사용됨
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                from supabase import create_client
+
+                load_dotenv()
+                url = os.environ.get("SUPABASE_URL")
+                key = os.environ.get("SUPABASE_SERVICE_KEY")
+                _supabase = create_client(url, key)
+                logger.info("🔌 Supabase 클라이언트 생성")
+    return _supabase
+
+
+async def get_async_supabase():
+    # 비동기 서버 모드용 Supabase 클라이언트 (httpx.AsyncClient 연결 풀을 프로세스 전체에서 공유)
+    global _async_supabase, _async_supabase_lock
+    if _async_supabase is None:
+        if _async_supabase_lock is None:
+            _async_supabase_lock = asyncio.Lock()
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                from supabase import acreate_client
+
+                load_dotenv()
+                _async_supabase = await acreate_client(
+                    os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_SERVICE_KEY")
+                )
+                logger.info("🔌 Supabase 비동기 클라이언트 생성")
+    return _async_supabase
+
+
+class _LazySupabase:
+    # import 시점에는 아무것도 만들지 않고, 속성에 처음 접근할 때 get_supabase() 호출
+    def __getattr__(self, name):
+        return getattr(get_supabase(), name)
+
+
+supabase = _LazySupabase()
@@ -0,0 +1,75 @@
+import hashlib
+
+from metrics import supabase_call
+
+# Files 테이블에 필요한 컬럼 (Supabase SQL 에디터에서 한 번 실행)
+#   alter table "Files" add column if not exists content_hash text;
+#   create index if not exists files_content_hash_idx on "Files" (content_hash);
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 재사용 가능한 처리 결과 컬럼
+REUSABLE_COLUMNS = 'id, content_hash, original_url, translated_url, translated_title, summarize, understand, extracted_text'
+
+
+def file_sha256(path):
+    # 파일 전체를 메모리에 올리지 않고 청크 단위로 해시 계산
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_key(file_hash, lang_in, lang_out, prompt):
+    # 같은 파일이라도 번역 언어나 프롬프트가 다르면 다른 결과로 취급
+    h = hashlib.sha256()
+    for part in (file_hash, lang_in, lang_out, prompt or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def find_processed(supabase, key):
+    # 요약과 번역이 모두 성공한 기존 레코드만 재사용 대상으로 본다
+    with supabase_call('select'):
+        response = supabase.table('Files').select(REUSABLE_COLUMNS) \
+            .eq('content_hash', key).not_.is_('translated_url', 'null') \
+            .neq('summarize', '요약 생성 실패').limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+def find_processed_many(supabase, keys):
+    # 여러 키를 한 번의 조회로: {content_hash: 재사용할 행}
+    if not keys:
+        return {}
+    with supabase_call('select'):
+        response = supabase.table('Files').select(REUSABLE_COLUMNS) \
+            .in_('content_hash', list(keys)).not_.is_('translated_url', 'null') \
+            .neq('summarize', '요약 생성 실패').execute()
+    processed = {}
+    for row in response.data:
+        processed.setdefault(row['content_hash'], row)
+    return processed
+
+
+def clone_row(source, user_id, original_title):
+    # Storage 객체와 AI 결과는 그대로 두고 Files 행만 새로 만듦
+    return {
+        'user_id': user_id,
+        'original_title': original_title,
+        'translated_title': f"{original_title} (번역본)",
+        'original_url': source['original_url'],
+        'translated_url': source['translated_url'],
+        'summarize': source['summarize'],
+        'understand': source['understand'],
+        'extracted_text': source['extracted_text'],
+        'content_hash': source['content_hash'],
+    }
+
+
+def clone_record(supabase, source, user_id, original_title):
+    with supabase_call('insert'):
+        response = supabase.table('Files').insert(clone_row(source, user_id, original_title)).execute()
+    return response.data[0]['id']
+
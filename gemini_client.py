@@ -0,0 +1,410 @@
+import os
+import sys
+import json
+import asyncio
+import time
+import random
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 요약/번역 등 고정 모델
+DEFAULT_MODEL = 'gemini-2.5-flash-lite'
+# 모델 목록 조회 실패 시 채팅 기본값
+FALLBACK_CHAT_MODEL = 'gemini-pro'
+# 채팅 모델을 직접 지정하면 목록 조회를 아예 하지 않음
+CHAT_MODEL = os.environ.get("CHAT_MODEL")
+# 모델 목록 캐시 유지 시간(초)
+MODEL_CACHE_TTL = int(os.environ.get("MODEL_CACHE_TTL", "3600"))
+
+# 쿼터에 맞춘 분당 요청 수와 순간 허용량(burst)
+# 모든 프로세스를 합친 값이고 버킷은 프로세스마다 따로 있으므로 다음처럼 나눠 씀
+#  - 번역 워커: GEMINI_RPM * GEMINI_TRANSLATE_SHARE 를 TRANSLATE_WORKERS 개가 나눔
+#  - 웹/배치 메인 프로세스: 나머지 GEMINI_RPM * (1 - GEMINI_TRANSLATE_SHARE) 를 WEB_CONCURRENCY 개가 나눔
+#    (gunicorn 워커 수와 같게 설정, batch.py는 메인 프로세스 1개)
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "60"))
+GEMINI_BURST = int(os.environ.get("GEMINI_BURST", "10"))
+GEMINI_TRANSLATE_SHARE = min(max(float(os.environ.get("GEMINI_TRANSLATE_SHARE", "0.5")), 0.05), 0.95)
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# 동시에 진행할 수 있는 최대 요청 수
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))
+# 429/5xx 재시도 횟수와 대기 시간(초)
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "5"))
+GEMINI_BACKOFF_BASE = float(os.environ.get("GEMINI_BACKOFF_BASE", "1.0"))
+GEMINI_BACKOFF_MAX = float(os.environ.get("GEMINI_BACKOFF_MAX", "30.0"))
+
+_configure_lock = threading.Lock()
+_configured = False
+
+_models = {}
+_models_lock = threading.Lock()
+
+_chat_model_name = None
+_chat_model_resolved_at = 0.0
+_refresh_lock = threading.Lock()
+_refreshing = False
+
+
+def _genai():
+    # google.generativeai(grpc/protobuf)는 첫 호출 때만 import
+    import google.generativeai as genai
+    return genai
+
+
+def configure(api_key=None):
+    # genai.configure는 프로세스당 한 번만 (api_key를 안 주면 환경변수 사용)
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if not _configured:
+            load_dotenv()
+            api_key = api_key or os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+            _genai().configure(api_key=api_key)
+            _configured = True
+
+
+def get_model(name=DEFAULT_MODEL):
+    # 같은 이름의 GenerativeModel은 요청 간에 재사용
+    model = _models.get(name)
+    if model is None:
+        configure()
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = _genai().GenerativeModel(name)
+                _models[name] = model
+    return model
+
+
+def _discover_chat_model():
+    # generateContent를 지원하는 첫 번째 gemini 모델 찾기
+    configure()
+    try:
+        for m in _genai().list_models():
+            if 'generateContent' in m.supported_generation_methods and 'gemini' in m.name:
+                logger.info(f"사용할 모델 발견: {m.name}")
+                return m.name
+    except Exception as e:
+        logger.error(f"모델 목록 조회 실패 (기본값 사용): {e}")
+        return None
+    return None
+
+
+def _refresh_chat_model():
+    global _chat_model_name, _chat_model_resolved_at, _refreshing
+    try:
+        name = _discover_chat_model()
+        if name:
+            _chat_model_name = name
+        elif _chat_model_name is None:
+            _chat_model_name = FALLBACK_CHAT_MODEL
+        _chat_model_resolved_at = time.time()
+    finally:
+        _refreshing = False
+
+
+def resolve_chat_model_name():
+    # 첫 호출에만 동기로 조회하고, TTL이 지나면 기존 값을 쓰면서 백그라운드로 갱신
+    global _refreshing
+    if CHAT_MODEL:
+        return CHAT_MODEL
+    if _chat_model_name is None:
+        with _refresh_lock:
+            if _chat_model_name is None:
+                _refreshing = True
+                _refresh_chat_model()
+        return _chat_model_name
+    if time.time() - _chat_model_resolved_at > MODEL_CACHE_TTL:
+        with _refresh_lock:
+            if not _refreshing:
+                _refreshing = True
+                threading.Thread(target=_refresh_chat_model, name="model-refresh", daemon=True).start()
+    return _chat_model_name
+
+
+# ---------------------------------------------------------
+# 호출 제어: 속도 제한 + 동시성 제한 + 재시도 + 같은 요청 합치기
+# ---------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        # 토큰을 하나 쓰면 0, 부족하면 기다려야 하는 시간(초) 반환
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+def _share_bucket(fraction, processes):
+    # 전체 쿼터 중 fraction을 processes 개 프로세스가 똑같이 나눈 버킷
+    processes = max(1, processes)
+    return TokenBucket(GEMINI_RPM * fraction / processes, int(GEMINI_BURST * fraction / processes))
+
+
+_bucket = _share_bucket(1 - GEMINI_TRANSLATE_SHARE, WEB_CONCURRENCY)
+_semaphore = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+# 상태 코드만 알 수 있는 HTTP 오류 중 재시도할 것
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _retryable_errors():
+    try:
+        from google.api_core import exceptions
+        return (exceptions.ResourceExhausted, exceptions.TooManyRequests, exceptions.ServiceUnavailable,
+                exceptions.InternalServerError, exceptions.DeadlineExceeded)
+    except ImportError:
+        return ()
+
+
+_RETRYABLE = None
+
+
+def _retryable():
+    # google.api_core도 실제로 오류가 났을 때만 import
+    global _RETRYABLE
+    if _RETRYABLE is None:
+        _RETRYABLE = _retryable_errors()
+    return _RETRYABLE
+
+
+def _openai_retryable():
+    # pdf2zh의 GeminiTranslator는 OpenAI 호환 API를 쓰므로 429/5xx가 openai 예외로 옴
+    # (openai가 이미 로드된 프로세스에서만 확인, 웹 프로세스에서 일부러 import하지 않음)
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return ()
+    return tuple(getattr(openai, name) for name in
+                 ("RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError")
+                 if hasattr(openai, name))
+
+
+def _is_retryable(e):
+    if isinstance(e, _retryable() + _openai_retryable()):
+        return True
+    # 그 밖의 SDK HTTP 오류(openai.APIStatusError 등)는 상태 코드로 판단
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status in RETRYABLE_STATUS
+
+
+def _backoff_delay(attempt):
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _error_kind(e):
+    name = type(e).__name__
+    if name in ("DeadlineExceeded", "TimeoutError", "ReadTimeout", "APITimeoutError"):
+        return "timeout"
+    if name in ("ResourceExhausted", "TooManyRequests", "RateLimitError"):
+        return "rate_limited"
+    return "error"
+
+
+def call_with_limits(fn, *args, _op="generate", **kwargs):
+    # 토큰 버킷으로 속도를 맞추고, 동시 요청 수를 제한하고, 429/5xx면 지수 백오프(+지터)로 재시도
+    # 대기/재시도를 포함한 전체 시간과 오류 종류를 metrics에 기록
+    started = time.perf_counter()
+    error_kind = None
+    try:
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            _bucket.acquire()
+            with _semaphore:
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    if not _is_retryable(e) or attempt >= GEMINI_MAX_RETRIES:
+                        raise
+                    metrics.GEMINI_ERRORS.inc(op=_op, kind="retry")
+                    delay = _backoff_delay(attempt)
+                    logger.warning(f"⏳ Gemini 재시도 {attempt + 1}/{GEMINI_MAX_RETRIES} ({delay:.1f}s 후): {e}")
+            time.sleep(delay)
+    except Exception as e:
+        error_kind = _error_kind(e)
+        raise
+    finally:
+        metrics.observe_gemini(_op, time.perf_counter() - started, error_kind)
+
+
+async def acall_with_limits(fn, *args, _op="generate", **kwargs):
+    # call_with_limits의 비동기 버전 (fn은 코루틴 함수)
+    # 토큰 버킷과 동시성 제한은 동기 호출과 같은 것을 공유하되, 기다리는 동안 이벤트 루프를 막지 않음
+    started = time.perf_counter()
+    error_kind = None
+    try:
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            await _bucket.acquire_async()
+            while not _semaphore.acquire(blocking=False):
+                await asyncio.sleep(0.05)
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if not _is_retryable(e) or attempt >= GEMINI_MAX_RETRIES:
+                    raise
+                metrics.GEMINI_ERRORS.inc(op=_op, kind="retry")
+                delay = _backoff_delay(attempt)
+                logger.warning(f"⏳ Gemini 재시도 {attempt + 1}/{GEMINI_MAX_RETRIES} ({delay:.1f}s 후): {e}")
+            finally:
+                _semaphore.release()
+            await asyncio.sleep(delay)
+    except Exception as e:
+        error_kind = _error_kind(e)
+        raise
+    finally:
+        metrics.observe_gemini(_op, time.perf_counter() - started, error_kind)
+
+
+def _coalesce_key(model_name, prompt, kwargs):
+    raw = json.dumps([model_name, prompt, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def generate(prompt, model_name=DEFAULT_MODEL, **kwargs):
+    # generate_content 공용 진입점. 같은 모델/프롬프트/설정 요청이 진행 중이면 그 결과를 같이 받음
+    key = _coalesce_key(model_name, prompt, kwargs)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result()
+
+    try:
+        response = call_with_limits(get_model(model_name).generate_content, prompt, **kwargs)
+        metrics.record_tokens(model_name, response)
+        future.set_result(response)
+        return response
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+_ainflight = {}
+
+
+async def agenerate(prompt, model_name=DEFAULT_MODEL, **kwargs):
+    # generate의 비동기 버전 (비동기 서버 모드에서 사용, 같은 요청 합치기 포함)
+    key = _coalesce_key(model_name, prompt, kwargs)
+    future = _ainflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+    future = asyncio.get_running_loop().create_future()
+    _ainflight[key] = future
+    try:
+        response = await acall_with_limits(get_model(model_name).generate_content_async, prompt, **kwargs)
+        metrics.record_tokens(model_name, response)
+        future.set_result(response)
+        return response
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()  # 같이 기다리는 요청이 없어도 경고가 나지 않게
+        raise
+    finally:
+        _ainflight.pop(key, None)
+
+
+def _cancel_stream(response):
+    cancel = getattr(getattr(response, '_iterator', None), 'cancel', None)
+    if cancel:
+        cancel()
+
+
+def generate_stream(prompt, model_name=DEFAULT_MODEL, **kwargs):
+    # 응답 조각(chunk)을 생성되는 대로 yield (스트리밍은 같은 요청 합치기 없음)
+    # 스트림 시작 요청은 call_with_limits로, 읽는 도중 429/5xx가 나면 아직 조각을 내보내기 전일 때만
+    # 처음부터 다시 요청 (이미 보낸 조각이 있으면 중복되므로 그대로 오류)
+    # 소비하는 쪽에서 close()하면(클라이언트 연결 끊김 등) Gemini 스트림도 중단
+    model = get_model(model_name)
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        response = call_with_limits(model.generate_content, prompt, stream=True,
+                                    _op="generate_stream", **kwargs)
+        delivered = False
+        try:
+            for chunk in response:
+                delivered = True
+                yield chunk
+            return
+        except GeneratorExit:
+            _cancel_stream(response)
+            raise
+        except Exception as e:
+            if delivered or not _is_retryable(e) or attempt >= GEMINI_MAX_RETRIES:
+                metrics.GEMINI_ERRORS.inc(op="generate_stream", kind=_error_kind(e))
+                raise
+            metrics.GEMINI_ERRORS.inc(op="generate_stream", kind="retry")
+            delay = _backoff_delay(attempt)
+            logger.warning(f"⏳ Gemini 스트림 재시도 {attempt + 1}/{GEMINI_MAX_RETRIES} ({delay:.1f}s 후): {e}")
+        time.sleep(delay)
+
+
+def embed(texts, model, task_type):
+    configure()
+    result = call_with_limits(_genai().embed_content, model=model, content=texts, task_type=task_type, _op="embed")
+    return result['embedding']
+
+
+async def aembed(texts, model, task_type):
+    # embed의 비동기 버전 (비동기 서버 모드의 채팅 질문 임베딩)
+    configure()
+    result = await acall_with_limits(_genai().embed_content_async, model=model, content=texts,
+                                     task_type=task_type, _op="embed")
+    return result['embedding']
+
+
+def install_translator_limits(translator_cls, share=1):
+    # pdf2zh 번역기(Gemini)의 실제 호출(do_translate)에도 같은 제한을 적용
+    # 번역 몫(GEMINI_TRANSLATE_SHARE)을 워커 수(share)로 나눈 버킷을 이 워커 프로세스에서 사용
+    global _bucket
+    if getattr(translator_cls.do_translate, "_limited", False):
+        return
+    _bucket = _share_bucket(GEMINI_TRANSLATE_SHARE, share)
+    original = translator_cls.do_translate
+
+    def do_translate(self, *args, **kwargs):
+        return call_with_limits(original, self, *args, _op="translate", **kwargs)
+
+    do_translate._limited = True
+    translator_cls.do_translate = do_translate
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import builtins
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# IMPORT_PROFILE=1 이면 시작할 때 모듈별 import 시간을 측정해서 로그로 남김
+IMPORT_PROFILE = os.environ.get("IMPORT_PROFILE") == "1"
+# 로그에 보여줄 상위 모듈 수
+IMPORT_PROFILE_TOP = int(os.environ.get("IMPORT_PROFILE_TOP", "15"))
+
+# 첫 요청 때까지 미뤄둔 무거운 모듈 (로드 여부를 보고서에 표시)
+LAZY_MODULES = ("supabase", "google.generativeai", "fitz", "pypdf", "httpx", "jwt", "summarize")
+
+_started = time.perf_counter()
+_timings = {}
+_stack = []
+_lock = threading.Lock()
+_original_import = builtins.__import__
+_startup_seconds = None
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # 처음 로드되는 모듈만 측정 (포함 시간 / 하위 import를 뺀 자체 시간)
+    if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+        return _original_import(name, globals, locals, fromlist, level)
+    started = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        with _lock:
+            _timings[name] = {"cumulative_ms": round(elapsed * 1000, 1),
+                              "self_ms": round((elapsed - children) * 1000, 1)}
+
+
+def install():
+    # app.py 맨 위에서 호출 (이후 import만 측정됨)
+    if IMPORT_PROFILE:
+        builtins.__import__ = _profiled_import
+
+
+def finish():
+    # app.py 초기화가 끝났을 때 호출: 측정을 멈추고 결과를 로그로 남김
+    global _startup_seconds
+    builtins.__import__ = _original_import
+    _startup_seconds = time.perf_counter() - _started
+    report = startup_report()
+    logger.info(f"🚀 앱 초기화 {report['startup_seconds']}s, 지연 로드 모듈 중 로드됨: {report['lazy_loaded'] or '없음'}")
+    for module in report["imports"][:IMPORT_PROFILE_TOP]:
+        logger.info(f"   import {module['module']}: {module['cumulative_ms']}ms (자체 {module['self_ms']}ms)")
+    return report
+
+
+def startup_report():
+    with _lock:
+        imports = sorted(({"module": name, **t} for name, t in _timings.items()),
+                         key=lambda m: m["cumulative_ms"], reverse=True)
+    return {
+        "startup_seconds": round(_startup_seconds, 3) if _startup_seconds is not None else None,
+        "profiled": IMPORT_PROFILE,
+        "lazy_loaded": [name for name in LAZY_MODULES if name in sys.modules],
+        "imports": imports,
+    }
@@ -0,0 +1,159 @@
+import io
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+
+from flask import Request
+
+logger = logging.getLogger(__name__)
+
+# 업로드 최대 크기 (초과 시 413)
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_MB", "50")) * 1024 * 1024
+# 이 크기까지는 메모리에만 두고, 넘으면 디스크로 옮김
+SPOOL_MAX_MEMORY = int(os.environ.get("SPOOL_MAX_MEMORY_MB", "8")) * 1024 * 1024
+# 디스크로 넘어간 업로드를 둘 디렉터리 (app에서 TEMP_DIR로 설정)
+SPOOL_DIR = None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SpooledUpload(io.RawIOBase):
+    # 업로드 파일 버퍼
+    # - 쓰는 동안 sha256과 크기를 같이 계산 (파일을 다시 읽지 않음)
+    # - SPOOL_MAX_MEMORY 까지는 메모리, 넘으면 이름 있는 임시 파일로 옮김
+    # - 요청이 끝나며 close()가 불리면 버퍼를 정리하지만, detach()로 백그라운드 작업에 넘긴 버퍼는
+    #   작업이 release()할 때까지 유지
+    def __init__(self, max_memory=SPOOL_MAX_MEMORY, max_bytes=UPLOAD_MAX_BYTES, spool_dir=None):
+        super().__init__()
+        self.max_memory = max_memory
+        self.max_bytes = max_bytes
+        self.spool_dir = spool_dir or SPOOL_DIR
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._path = None
+        self._lock = threading.Lock()
+        self._detached = False
+
+    # --- 쓰기 (werkzeug 폼 파서가 호출) ---
+    def writable(self):
+        return True
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(f"업로드 최대 크기({self.max_bytes // (1024 * 1024)}MB)를 초과했습니다.")
+        self._sha256.update(data)
+        if self._path is None and self.size > self.max_memory:
+            self._spill()
+        return self._buffer.write(data)
+
+    def _spill(self):
+        fd, self._path = tempfile.mkstemp(prefix="upload_", suffix=".pdf", dir=self.spool_dir)
+        disk = os.fdopen(fd, "w+b")
+        disk.write(self._buffer.getbuffer())
+        self._buffer = disk
+        logger.info(f"💾 업로드가 {self.max_memory // (1024 * 1024)}MB를 넘어 디스크로 이동: {self._path}")
+
+    def read(self, size=-1):
+        return self._buffer.read(size)
+
+    def readinto(self, b):
+        data = self._buffer.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._buffer.seek(offset, whence)
+
+    def tell(self):
+        return self._buffer.tell()
+
+    def flush(self):
+        self._buffer.flush()
+
+    def close(self):
+        # 요청 정리 시 호출됨: 작업에 넘기지 않은 버퍼(검증 실패, 잘못된 필드 이름 등)는 여기서 정리
+        if not self._detached:
+            self.release()
+
+    def detach(self):
+        # 백그라운드 작업이 이 버퍼를 맡음 (이후 정리는 작업의 release() 책임)
+        self._detached = True
+        return self
+
+    @property
+    def closed(self):
+        return False
+
+    # --- 파이프라인에서 사용 ---
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    @property
+    def in_memory(self):
+        return self._path is None
+
+    def getvalue(self):
+        # 메모리에 있는 경우의 내용 (최대 SPOOL_MAX_MEMORY 크기)
+        return self._buffer.getvalue()
+
+    def storage_body(self):
+        # Supabase Storage 업로드용: 메모리면 bytes, 디스크면 파일 경로
+        self.flush()
+        return self.getvalue() if self.in_memory else self._path
+
+    def pdf_source(self):
+        # 텍스트 추출용: 메모리면 bytes, 디스크로 넘어갔으면 파일 경로
+        self.flush()
+        return self.getvalue() if self.in_memory else self._path
+
+    def materialize(self, directory):
+        # 파일 경로가 꼭 필요한 경우(pdf2zh 번역)에만 디스크에 씀
+        with self._lock:
+            if self._path is None:
+                fd, self._path = tempfile.mkstemp(prefix="upload_", suffix=".pdf", dir=directory)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self._buffer.getbuffer())
+                disk = open(self._path, "r+b")
+                self._buffer = disk
+            else:
+                self.flush()
+            return self._path
+
+    def release(self):
+        with self._lock:
+            self._buffer.close()
+            if self._path and os.path.exists(self._path):
+                try:
+                    os.remove(self._path)
+                except OSError:
+                    pass
+            self._path = None
+
+
+class IngestRequest(Request):
+    # multipart 업로드 파일을 SpooledUpload 에 바로 받아서
+    # 저장 -> 재오픈 -> 해시 같은 추가 복사 없이 한 번에 처리
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # 라우트가 spool_max_memory를 정해 두면 그 값 사용 (일괄 업로드는 0: 바로 디스크로)
+        upload = SpooledUpload(max_memory=getattr(self, 'spool_max_memory', SPOOL_MAX_MEMORY))
+        # 파싱 도중 실패하면(UploadTooLarge 등) request.files에 들어가지 않으므로 따로 기록해 두고 close에서 정리
+        self.__dict__.setdefault('_spooled_uploads', []).append(upload)
+        return upload
+
+    def close(self):
+        for upload in self.__dict__.get('_spooled_uploads', ()):
+            upload.close()
+        super().close()
@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# 동시에 실행할 업로드 작업 수 (환경변수로 조절)
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", "2"))
+
+# 완료된 작업 정보를 메모리에 보관하는 시간(초)
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCESS = "success"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# 작업 함수가 이 값을 반환하면 아직 끝나지 않은 것으로 두고, JobManager.resume으로 이어서 실행
+DEFERRED = object()
+
+
+class Job:
+    def __init__(self, stage_names, meta=None):
+        self.id = uuid.uuid4().hex
+        self.status = PENDING
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.result = {}
+        self.meta = meta or {}
+        self.stages = {
+            name: {"status": PENDING, "started_at": None, "finished_at": None, "error": None}
+            for name in stage_names
+        }
+        self._lock = threading.Lock()
+
+    def start_stage(self, name):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"status": PENDING, "started_at": None,
+                                                  "finished_at": None, "error": None})
+            stage["status"] = RUNNING
+            stage["started_at"] = time.time()
+
+    def finish_stage(self, name, status=SUCCESS, error=None):
+        with self._lock:
+            stage = self.stages[name]
+            stage["status"] = status
+            stage["finished_at"] = time.time()
+            stage["error"] = error
+            # 시작하지 않고 바로 건너뛴 단계는 소요 시간 0으로 기록
+            started_at = stage["started_at"] or stage["finished_at"]
+        metrics.observe_stage(name, status, stage["finished_at"] - started_at)
+
+    def update_stage(self, name, **info):
+        # 단계에 부가 정보 기록 (예: 메모리 최대치)
+        with self._lock:
+            self.stages[name].update(info)
+
+    def stage(self, name):
+        # with job.stage('extract'): ... 형태로 단계 진행 상황 기록
+        return _StageContext(self, name)
+
+    def progress(self):
+        done = sum(1 for s in self.stages.values() if s["status"] in (SUCCESS, FAILED, SKIPPED))
+        return round(done / len(self.stages), 2) if self.stages else 1.0
+
+    def to_dict(self, include_stages=True):
+        with self._lock:
+            data = {
+                "job_id": self.id,
+                "status": self.status,
+                "progress": self.progress(),
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "error": self.error,
+                "result": dict(self.result),
+            }
+            if include_stages:
+                data["stages"] = [
+                    {"name": name, **stage} for name, stage in self.stages.items()
+                ]
+            return data
+
+
+class _StageContext:
+    def __init__(self, job, name):
+        self.job = job
+        self.name = name
+
+    def __enter__(self):
+        self.job.start_stage(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None:
+            self.job.finish_stage(self.name)
+        else:
+            self.job.finish_stage(self.name, FAILED, str(exc))
+        return False
+
+
+class JobManager:
+    def __init__(self, max_workers=MAX_CONCURRENT_JOBS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, stage_names, meta=None, *args, **kwargs):
+        # fn(job, *args, **kwargs) 를 백그라운드 워커에서 실행하고 Job을 바로 반환
+        job = Job(stage_names, meta)
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        logger.info(f"📥 작업 등록: {job.id}")
+        return job
+
+    def resume(self, job, fn, *args, **kwargs):
+        # DEFERRED로 멈춘 작업의 나머지를 같은 풀에서 이어서 실행
+        self._executor.submit(self._run, job, fn, args, kwargs)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_meta(self, key):
+        # 아직 끝나지 않은(대기/실행/DEFERRED) 작업들의 meta[key] 값 집합
+        with self._lock:
+            return {job.meta.get(key) for job in self._jobs.values()
+                    if job.status in (PENDING, RUNNING) and job.meta.get(key)}
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        if job.started_at is None:
+            job.started_at = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ 작업 실패 ({job.id}): {e}")
+            job.error = str(e)
+            job.status = FAILED
+            job.finished_at = time.time()
+            return
+        if result is DEFERRED:
+            return
+        if result:
+            job.result.update(result)
+        job.status = SUCCESS
+        job.finished_at = time.time()
+
+    def _evict_expired(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and now - job.finished_at > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class BatchCollector:
+    # 여러 작업이 만든 항목을 모아 한 번에 처리 (예: Files 일괄 insert)
+    # 예상 개수만큼 add/discard가 모이면 마지막으로 도착한 스레드가 flush_fn(items)을 실행하고
+    # 각 항목의 callback(결과, 오류)을 호출. 기다리는 스레드가 없어서 작업 풀을 막지 않음
+    def __init__(self, expected, flush_fn):
+        self.expected = expected
+        self.flush_fn = flush_fn
+        self._items = []
+        self._callbacks = []
+        self._arrived = 0
+        self._lock = threading.Lock()
+
+    def add(self, item, callback):
+        with self._lock:
+            self._items.append(item)
+            self._callbacks.append(callback)
+            self._arrived += 1
+            ready = self._arrived == self.expected
+        if ready:
+            self._flush()
+
+    def discard(self):
+        # 실패해서 항목을 내지 못하는 작업
+        with self._lock:
+            self._arrived += 1
+            ready = self._arrived == self.expected
+        if ready:
+            self._flush()
+
+    def _flush(self):
+        if not self._items:
+            return
+        try:
+            results, error = self.flush_fn(self._items), None
+        except Exception as e:
+            logger.error(f"❌ 일괄 처리 실패: {e}")
+            results, error = [None] * len(self._items), e
+        for callback, result in zip(self._callbacks, results):
+            callback(result, error)
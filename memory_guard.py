@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# 프로세스(+자식 프로세스) 전체 메모리 예산. Render 무료 플랜(512MB) 기준 기본값
+MEMORY_BUDGET_MB = int(os.environ.get("MEMORY_BUDGET_MB", "450"))
+# 예산이 빌 때까지 기다리는 최대 시간(초), 넘으면 거절
+ADMISSION_TIMEOUT = int(os.environ.get("MEMORY_ADMISSION_TIMEOUT", "300"))
+# 메모리 사용량 측정 주기(초)
+SAMPLE_INTERVAL = float(os.environ.get("MEMORY_SAMPLE_INTERVAL", "0.5"))
+
+# 단계별 예상 추가 메모리(MB) (실측 최대치가 더 크면 그 값을 사용)
+# 승인을 받는 단계는 메모리를 크게 쓰는 추출/번역뿐 (요약/인덱스는 대부분 Gemini 응답 대기라
+# 예약을 잡고 있으면 추출만 막게 되므로 승인 없이 실행)
+STAGE_ESTIMATES_MB = {
+    'extract': int(os.environ.get("MEMORY_ESTIMATE_EXTRACT_MB", "60")),
+    'translate': int(os.environ.get("MEMORY_ESTIMATE_TRANSLATE_MB", "250")),
+}
+DEFAULT_ESTIMATE_MB = 20
+# 상주 워커가 이미 떠 있을 때의 예상치 (워커 메모리는 current_rss_mb()에 이미 포함되어 있으므로
+# 모델 로딩분을 빼고 작업 중 늘어나는 만큼만 잡음)
+WARM_ESTIMATES_MB = {
+    'translate': int(os.environ.get("MEMORY_ESTIMATE_TRANSLATE_WARM_MB", "60")),
+}
+
+
+class MemoryBudgetExceeded(Exception):
+    pass
+
+
+def current_rss_mb():
+    # 웹 프로세스 + 번역/추출 워커 등 자식 프로세스 RSS 합계
+    process = psutil.Process()
+    total = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total / (1024 * 1024)
+
+
+class Ticket:
+    def __init__(self, stage, estimate_mb, start_mb, warm=False):
+        self.stage = stage
+        self.warm = warm
+        self.estimate_mb = estimate_mb
+        self.start_mb = start_mb
+        self.peak_mb = start_mb
+        self.waited = 0.0
+
+
+class AdmissionController:
+    # 무거운 단계를 시작하기 전에 "현재 사용량 + 실행 중 단계 예약분 + 이번 예상치"가
+    # 예산을 넘으면 자리가 날 때까지 대기하고, 시간 안에 안 나면 거절
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB):
+        self.budget_mb = budget_mb
+        self._cond = threading.Condition()
+        self._reserved = 0.0
+        self._active = set()
+        self._stats = {}
+        self._process_peak_mb = 0.0
+        self._sampler = None
+
+    def _stage_stats(self, stage):
+        return self._stats.setdefault(stage, {
+            "runs": 0, "rejected": 0, "peak_rss_mb": 0.0, "max_growth_mb": 0.0, "max_growth_warm_mb": 0.0,
+            "total_wait_s": 0.0,
+        })
+
+    def _estimate(self, stage, estimate_mb, warm):
+        if estimate_mb is not None:
+            return estimate_mb
+        stats = self._stats.get(stage, {})
+        if warm and stage in WARM_ESTIMATES_MB:
+            return max(WARM_ESTIMATES_MB[stage], stats.get("max_growth_warm_mb", 0.0))
+        return max(STAGE_ESTIMATES_MB.get(stage, DEFAULT_ESTIMATE_MB), stats.get("max_growth_mb", 0.0))
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name="memory-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(SAMPLE_INTERVAL)
+            with self._cond:
+                if not self._active:
+                    continue
+                tickets = list(self._active)
+            rss = current_rss_mb()
+            with self._cond:
+                self._process_peak_mb = max(self._process_peak_mb, rss)
+                for ticket in tickets:
+                    ticket.peak_mb = max(ticket.peak_mb, rss)
+
+    @contextmanager
+    def admit(self, stage, estimate_mb=None, timeout=ADMISSION_TIMEOUT, warm=False):
+        # warm=True: 이 단계가 쓰는 상주 워커가 이미 떠 있음 (WARM_ESTIMATES_MB 사용)
+        estimate = self._estimate(stage, estimate_mb, warm)
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                projected = current_rss_mb() + self._reserved + estimate
+                # 아무것도 실행 중이 아니면 예산을 넘더라도 하나는 통과시킴 (영원히 막히지 않게)
+                if projected <= self.budget_mb or not self._active:
+                    break
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stage_stats(stage)["rejected"] += 1
+                    raise MemoryBudgetExceeded(
+                        f"메모리 예산 초과로 '{stage}' 단계 거절 (예상 {projected:.0f}MB / 예산 {self.budget_mb}MB)"
+                    )
+                self._cond.wait(min(remaining, SAMPLE_INTERVAL * 4))
+            ticket = Ticket(stage, estimate, current_rss_mb(), warm)
+            ticket.waited = time.monotonic() - started
+            self._reserved += estimate
+            self._active.add(ticket)
+            self._ensure_sampler()
+        try:
+            yield ticket
+        finally:
+            end_mb = current_rss_mb()
+            with self._cond:
+                ticket.peak_mb = max(ticket.peak_mb, end_mb)
+                self._process_peak_mb = max(self._process_peak_mb, ticket.peak_mb)
+                self._reserved -= estimate
+                self._active.discard(ticket)
+                stats = self._stage_stats(stage)
+                stats["runs"] += 1
+                stats["peak_rss_mb"] = round(max(stats["peak_rss_mb"], ticket.peak_mb), 1)
+                growth_key = "max_growth_warm_mb" if ticket.warm else "max_growth_mb"
+                stats[growth_key] = round(max(stats[growth_key], ticket.peak_mb - ticket.start_mb), 1)
+                stats["total_wait_s"] = round(stats["total_wait_s"] + ticket.waited, 3)
+                self._cond.notify_all()
+
+    def report(self):
+        with self._cond:
+            return {
+                "budget_mb": self.budget_mb,
+                "current_rss_mb": round(current_rss_mb(), 1),
+                "reserved_mb": round(self._reserved, 1),
+                "peak_rss_mb": round(self._process_peak_mb, 1),
+                "stages": {name: dict(stats) for name, stats in self._stats.items()},
+            }
+
+
+admission = AdmissionController()
@@ -0,0 +1,231 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 응답에 Server-Timing 헤더를 붙일지 여부
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING") == "1"
+
+# 초 단위 기본 구간 (짧은 API 호출부터 긴 번역 작업까지)
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series['sum']:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+# ---------------------------------------------------------
+# 수집 항목
+# ---------------------------------------------------------
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "업로드 파이프라인 단계별 소요 시간", ("stage", "status"))
+STAGE_TOTAL = Counter(
+    "pipeline_stage_total", "업로드 파이프라인 단계 실행 횟수", ("stage", "status"))
+GEMINI_SECONDS = Histogram(
+    "gemini_request_seconds", "Gemini API 호출 시간 (재시도 포함)", ("op",))
+GEMINI_ERRORS = Counter(
+    "gemini_errors_total", "Gemini API 오류 횟수", ("op", "kind"))
+GEMINI_TOKENS = Counter(
+    "gemini_tokens_total", "Gemini 사용 토큰 수", ("model", "direction"))
+SUPABASE_SECONDS = Histogram(
+    "supabase_request_seconds", "Supabase 테이블/Storage 호출 시간", ("op",))
+SUPABASE_ERRORS = Counter(
+    "supabase_errors_total", "Supabase 호출 오류 횟수", ("op",))
+TRANSLATION_TIMEOUTS = Counter(
+    "translation_timeouts_total", "번역 배치 시간 초과 횟수")
+STORAGE_REAPED = Counter(
+    "storage_reaper_objects_total", "문서 삭제 후 정리한 Storage 객체 수", ("status",))
+
+_registry = [STAGE_SECONDS, STAGE_TOTAL, GEMINI_SECONDS, GEMINI_ERRORS, GEMINI_TOKENS,
+             SUPABASE_SECONDS, SUPABASE_ERRORS, TRANSLATION_TIMEOUTS, STORAGE_REAPED]
+
+
+# ---------------------------------------------------------
+# 요청 단위 Server-Timing 구간 (요청을 처리하는 스레드에서만 기록)
+# ---------------------------------------------------------
+_local = threading.local()
+
+
+def start_request():
+    _local.spans = []
+
+
+def _add_span(name, seconds):
+    spans = getattr(_local, "spans", None)
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+def server_timing_header():
+    spans = getattr(_local, "spans", None) or []
+    _local.spans = None
+    # 같은 이름은 합쳐서 한 번만 표시 (예: Gemini 여러 번 호출)
+    totals = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+@contextmanager
+def span(name):
+    # 요청 처리 중의 구간 시간 (Server-Timing에만 기록)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_span(name, time.perf_counter() - started)
+
+
+def observe_stage(stage, status, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage, status=status)
+    STAGE_TOTAL.inc(stage=stage, status=status)
+    _add_span(stage, seconds)
+
+
+@contextmanager
+def supabase_call(op):
+    # with supabase_call('storage_upload'): ... 형태로 호출 시간/오류 기록
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SUPABASE_ERRORS.inc(op=op)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        SUPABASE_SECONDS.observe(elapsed, op=op)
+        _add_span(f"supabase_{op}", elapsed)
+
+
+def observe_gemini(op, seconds, error_kind=None):
+    GEMINI_SECONDS.observe(seconds, op=op)
+    if error_kind:
+        GEMINI_ERRORS.inc(op=op, kind=error_kind)
+    _add_span(f"gemini_{op}", seconds)
+
+
+def record_tokens(model, response):
+    # 응답의 usage_metadata에서 입력/출력 토큰 수 기록 (없으면 무시)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    if prompt_tokens:
+        GEMINI_TOKENS.inc(prompt_tokens, model=model, direction="input")
+    if output_tokens:
+        GEMINI_TOKENS.inc(output_tokens, model=model, direction="output")
+
+
+def _memory_lines(report):
+    lines = [
+        "# TYPE memory_budget_mb gauge", f"memory_budget_mb {report['budget_mb']}",
+        "# TYPE memory_rss_mb gauge", f"memory_rss_mb {report['current_rss_mb']}",
+        "# TYPE memory_reserved_mb gauge", f"memory_reserved_mb {report['reserved_mb']}",
+        "# TYPE memory_peak_rss_mb gauge", f"memory_peak_rss_mb {report['peak_rss_mb']}",
+    ]
+    for field, kind in (("peak_rss_mb", "gauge"), ("rejected", "counter"), ("total_wait_s", "counter")):
+        name = f"memory_stage_{field}"
+        lines.append(f"# TYPE {name} {kind}")
+        for stage, stats in sorted(report["stages"].items()):
+            lines.append(f'{name}{{stage="{stage}"}} {stats[field]}')
+    return lines
+
+
+def _cache_lines(cache_stats):
+    lines = []
+    for field, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                        ("entries", "gauge"), ("bytes", "gauge")):
+        name = f"cache_{field}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, stats in sorted(cache_stats.items()):
+            lines.append(f'{name}{{cache="{cache}"}} {stats[field]}')
+    return lines
+
+
+def render(memory_report=None, cache_stats=None):
+    # Prometheus 텍스트 형식
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    if memory_report is not None:
+        lines.extend(_memory_lines(memory_report))
+    if cache_stats is not None:
+        lines.extend(_cache_lines(cache_stats))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,111 @@
+import json
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PAGE_STORE_VERSION = 1
+# 한 번에 조회할 수 있는 최대 페이지 수
+MAX_PAGES_PER_REQUEST = 50
+# 메모리에 보관할 페이지 인덱스 수 (인덱스는 작아서 개수로만 제한)
+INDEX_CACHE_SIZE = 256
+
+
+def blob_path(content_hash):
+    return f"texts/{content_hash}.bin"
+
+
+def index_path(content_hash):
+    return f"texts/{content_hash}.json"
+
+
+def storage_paths(content_hash):
+    return [blob_path(content_hash), index_path(content_hash)]
+
+
+def pack_pages(pages):
+    # 페이지마다 따로 압축해서 이어 붙이고, (시작 위치, 길이) 인덱스를 만든다
+    # 페이지 하나만 필요할 때 그 구간만 Range 요청으로 받아서 풀 수 있음
+    chunks = []
+    offsets = []
+    position = 0
+    for text in pages:
+        compressed = zlib.compress(text.encode("utf-8"), 6)
+        offsets.append([position, len(compressed)])
+        chunks.append(compressed)
+        position += len(compressed)
+    index = {"version": PAGE_STORE_VERSION, "pages": len(offsets), "offsets": offsets}
+    return b"".join(chunks), index
+
+
+def save_pages(supabase, bucket, content_hash, pages):
+    blob, index = pack_pages(pages)
+    storage = supabase.storage.from_(bucket)
+    with metrics.supabase_call("storage_upload"):
+        storage.upload(blob_path(content_hash), blob,
+                       file_options={"content-type": "application/octet-stream", "upsert": "true"})
+    with metrics.supabase_call("storage_upload"):
+        storage.upload(index_path(content_hash), json.dumps(index).encode("utf-8"),
+                       file_options={"content-type": "application/json", "upsert": "true"})
+    return index
+
+
+class PageReader:
+    # 저장된 페이지를 필요한 구간만 가져오는 읽기 도구
+    def __init__(self, supabase, bucket):
+        self.supabase = supabase
+        self.bucket = bucket
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._http = None
+
+    def _client(self):
+        # Range 요청용 HTTP 클라이언트 (첫 조회 때 만들고 연결 재사용)
+        if self._http is None:
+            import httpx
+            with self._lock:
+                if self._http is None:
+                    self._http = httpx.Client(timeout=30.0)
+        return self._http
+
+    def get_index(self, content_hash):
+        with self._lock:
+            index = self._indexes.get(content_hash)
+            if index is not None:
+                self._indexes.move_to_end(content_hash)
+                return index
+        with metrics.supabase_call("storage_download"):
+            raw = self.supabase.storage.from_(self.bucket).download(index_path(content_hash))
+        index = json.loads(raw)
+        with self._lock:
+            self._indexes[content_hash] = index
+            while len(self._indexes) > INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+        return index
+
+    def read_pages(self, content_hash, start, end):
+        # [start, end) 구간 페이지 텍스트 리스트 (0부터 시작)
+        index = self.get_index(content_hash)
+        offsets = index["offsets"][start:end]
+        if not offsets:
+            return []
+        first = offsets[0][0]
+        last = offsets[-1][0] + offsets[-1][1]
+
+        url = self.supabase.storage.from_(self.bucket).get_public_url(blob_path(content_hash))
+        with metrics.supabase_call("storage_range"):
+            response = self._client().get(url, headers={"Range": f"bytes={first}-{last - 1}"})
+            response.raise_for_status()
+        data = response.content
+        if response.status_code != 206:
+            # Range를 지원하지 않는 경우 전체에서 잘라냄
+            data = data[first:last]
+
+        return [
+            zlib.decompress(data[offset - first:offset - first + length]).decode("utf-8")
+            for offset, length in offsets
+        ]
@@ -0,0 +1,170 @@
+import os
+import atexit
+import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 페이지 추출에 쓸 프로세스 수 (프로세스마다 PDF 라이브러리를 따로 올리므로 기본은 최대 2개)
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", str(min(2, os.cpu_count() or 1))))
+# 마지막 추출이 끝나고 이 시간(초) 동안 쓰이지 않으면 프로세스 풀을 내림
+EXTRACT_IDLE_TIMEOUT = float(os.environ.get("EXTRACT_IDLE_TIMEOUT", "60"))
+# 프로세스 하나에 한 번에 넘길 페이지 수
+PAGES_PER_TASK = int(os.environ.get("EXTRACT_PAGES_PER_TASK", "16"))
+# 이보다 적은 페이지는 프로세스 풀 없이 바로 추출
+PARALLEL_MIN_PAGES = int(os.environ.get("EXTRACT_PARALLEL_MIN_PAGES", "32"))
+
+BACKENDS = ('pymupdf', 'pypdf')
+
+_executor = None
+_executor_lock = threading.Lock()
+_executor_users = 0
+_idle_timer = None
+
+
+def _acquire_executor():
+    global _executor, _executor_users, _idle_timer
+    with _executor_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        _executor_users += 1
+        return _executor
+
+
+def _release_executor():
+    # 마지막 사용자가 끝나면 유휴 타이머 시작
+    global _executor_users, _idle_timer
+    with _executor_lock:
+        _executor_users -= 1
+        if _executor_users == 0 and _executor is not None:
+            _idle_timer = threading.Timer(EXTRACT_IDLE_TIMEOUT, _shutdown_if_idle)
+            _idle_timer.daemon = True
+            _idle_timer.start()
+
+
+def _shutdown_if_idle():
+    global _executor, _idle_timer
+    with _executor_lock:
+        if _executor_users or _executor is None:
+            return
+        executor, _executor, _idle_timer = _executor, None, None
+    executor.shutdown(wait=True)
+    logger.info("💤 추출 프로세스 풀 종료 (유휴)")
+
+
+@atexit.register
+def shutdown():
+    global _executor, _idle_timer
+    with _executor_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+        executor, _executor, _idle_timer = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------
+# 백엔드별 구현 (워커 프로세스에서도 그대로 호출됨)
+# ---------------------------------------------------------
+def _open(source, backend):
+    if backend == 'pymupdf':
+        import fitz
+        if isinstance(source, (bytes, bytearray)):
+            return fitz.open(stream=source, filetype="pdf")
+        return fitz.open(source)
+    if backend == 'pypdf':
+        import io
+        from pypdf import PdfReader
+        if isinstance(source, (bytes, bytearray)):
+            return PdfReader(io.BytesIO(source))
+        return PdfReader(source)
+    raise ValueError(f"지원하지 않는 추출 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+
+
+def _page_count(doc, backend):
+    return doc.page_count if backend == 'pymupdf' else len(doc.pages)
+
+
+def _page_text(doc, index, backend):
+    if backend == 'pymupdf':
+        return doc[index].get_text()
+    return doc.pages[index].extract_text() or ''
+
+
+def _close(doc, backend):
+    if backend == 'pymupdf':
+        doc.close()
+
+
+def _extract_range(source, start, end, backend):
+    doc = _open(source, backend)
+    try:
+        return [_page_text(doc, i, backend) for i in range(start, end)]
+    finally:
+        _close(doc, backend)
+
+
+def page_count(source, backend='pymupdf'):
+    doc = _open(source, backend)
+    try:
+        return _page_count(doc, backend)
+    finally:
+        _close(doc, backend)
+
+
+def iter_pages(source, backend='pymupdf', workers=None):
+    # 페이지 텍스트를 순서대로 하나씩 yield
+    # source: 파일 경로 또는 PDF bytes
+    # 페이지가 많으면 페이지 구간을 프로세스 풀에 나눠 맡기고,
+    # 동시에 처리 중인 구간 수를 제한해 메모리가 문서 전체 크기에 비례하지 않도록 함
+    workers = workers or EXTRACT_WORKERS
+    doc = _open(source, backend)
+    try:
+        total = _page_count(doc, backend)
+        if total < PARALLEL_MIN_PAGES or workers <= 1:
+            for i in range(total):
+                yield _page_text(doc, i, backend)
+            return
+    finally:
+        _close(doc, backend)
+
+    # 프로세스마다 bytes를 복사해 넘기지 않도록 경로로 바꿔서 전달
+    temp_path = None
+    if isinstance(source, (bytes, bytearray)):
+        fd, temp_path = tempfile.mkstemp(prefix="extract_", suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(source)
+        source = temp_path
+
+    ranges = deque((s, min(s + PAGES_PER_TASK, total)) for s in range(0, total, PAGES_PER_TASK))
+    in_flight = deque()
+    executor = None
+    try:
+        executor = _acquire_executor()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append(executor.submit(_extract_range, source, start, end, backend))
+            for text in in_flight.popleft().result():
+                yield text
+    finally:
+        # 소비가 중간에 멈춘 경우 남은 구간은 취소
+        for future in in_flight:
+            future.cancel()
+        if executor is not None:
+            _release_executor()
+        if temp_path:
+            os.remove(temp_path)
+
+
+def extract_text(source, backend='pymupdf', separator='\n\n'):
+    return separator.join(iter_pages(source, backend))
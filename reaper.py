@@ -0,0 +1,172 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+import metrics
+from metrics import supabase_call
+from cache import chat_context_cache
+from clients import supabase
+
+logger = logging.getLogger(__name__)
+
+# 한 번의 Storage remove 호출에 넣을 최대 경로 수
+REAPER_BATCH_SIZE = int(os.environ.get("REAPER_BATCH_SIZE", "100"))
+# 첫 항목이 들어온 뒤 다른 삭제 요청을 모으며 기다리는 시간(초)
+REAPER_INTERVAL = float(os.environ.get("REAPER_INTERVAL", "2"))
+# 실패한 삭제의 재시도 횟수와 첫 대기 시간(초, 시도마다 2배)
+REAPER_MAX_RETRIES = int(os.environ.get("REAPER_MAX_RETRIES", "5"))
+REAPER_RETRY_DELAY = float(os.environ.get("REAPER_RETRY_DELAY", "5"))
+
+
+class _Task:
+    def __init__(self, paths, content_hash=None, attempts=0, expanded=False):
+        self.paths = list(paths)
+        self.content_hash = content_hash
+        self.attempts = attempts
+        # 부가 데이터 경로를 이미 paths에 포함했는지 (재시도 항목)
+        self.expanded = expanded
+
+
+class StorageReaper:
+    # Files 행을 지운 뒤 남은 Storage 객체를 백그라운드에서 모아서 삭제
+    # content_hash가 있는 항목은 매번 지우기 직전에 같은 해시를 쓰는 행이 남아 있는지,
+    # 그 해시를 처리 중인 작업이 있는지(in_use_fn) 확인하고, 둘 다 아닐 때만
+    # 원본/번역본과 부가 데이터(페이지 텍스트, 검색 인덱스, 번역 배치)를 지움
+    # (업로드는 Storage에 먼저 쓰고 Files 행을 나중에 넣으므로 행 조회만으로는 부족함)
+    def __init__(self, bucket, derived_paths_fn, in_use_fn=None,
+                 batch_size=REAPER_BATCH_SIZE, interval=REAPER_INTERVAL):
+        self.bucket = bucket
+        self.derived_paths_fn = derived_paths_fn
+        self.in_use_fn = in_use_fn
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._retrying = 0
+
+    def enqueue(self, paths, content_hash=None):
+        if not paths and not content_hash:
+            return
+        self._queue.put(_Task(paths, content_hash))
+        self._ensure_started()
+
+    def pending(self):
+        return self._queue.qsize() + self._retrying
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="storage-reaper", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            tasks = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(tasks) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    tasks.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._reap(tasks)
+            except Exception as e:
+                logger.error(f"❌ 스토리지 정리 실패: {e}")
+                for task in tasks:
+                    self._retry(task)
+
+    def _in_use(self, hashes):
+        # 아직 쓰이는 content_hash: 처리 중인 작업이 있거나 Files 행이 남아 있음
+        hashes = sorted(h for h in hashes if h)
+        in_use = {h for h in hashes if self.in_use_fn and self.in_use_fn(h)}
+        rest = [h for h in hashes if h not in in_use]
+        if rest:
+            with supabase_call('select'):
+                response = supabase.table('Files').select('content_hash').in_('content_hash', rest).execute()
+            in_use.update(row['content_hash'] for row in response.data)
+        return in_use
+
+    def _skip(self, paths, content_hash):
+        logger.info(f"♻️ 다른 문서가 같은 파일을 사용 중이라 스토리지 삭제 생략 ({content_hash}): {paths}")
+        metrics.STORAGE_REAPED.inc(len(paths), status="skipped")
+
+    def _reap(self, tasks):
+        # 1. 이미 다시 쓰이는 해시는 건너뛰고, 나머지는 부가 데이터 경로까지 펼침
+        in_use = self._in_use(task.content_hash for task in tasks)
+        entries = {}  # 경로 -> (content_hash, 시도 횟수)
+        for task in tasks:
+            if task.content_hash in in_use:
+                self._skip(task.paths, task.content_hash)
+                continue
+            task_paths = list(task.paths)
+            if task.content_hash and not task.expanded:
+                try:
+                    task_paths += self.derived_paths_fn(task.content_hash)
+                except Exception as e:
+                    logger.warning(f"⚠️ 부가 데이터 경로 조회 실패 ({task.content_hash}): {e}")
+                    self._retry(task)
+                    continue
+            for path in task_paths:
+                entries.setdefault(path, (task.content_hash, task.attempts))
+
+        # 2. 경로를 batch_size씩 나눠 삭제
+        items = list(entries.items())
+        for i in range(0, len(items), self.batch_size):
+            chunk = items[i:i + self.batch_size]
+            # 앞 단계 이후에 같은 파일이 다시 업로드되기 시작했을 수 있으므로 지우기 직전에 다시 확인
+            try:
+                in_use = self._in_use(h for _, (h, _) in chunk)
+            except Exception as e:
+                logger.warning(f"⚠️ 사용 여부 확인 실패: {e}")
+                self._retry_chunk(chunk)
+                continue
+            for content_hash in in_use:
+                self._skip([p for p, (h, _) in chunk if h == content_hash], content_hash)
+            chunk = [(p, info) for p, info in chunk if info[0] not in in_use]
+            if not chunk:
+                continue
+            try:
+                with supabase_call('storage_remove'):
+                    supabase.storage.from_(self.bucket).remove([p for p, _ in chunk])
+            except Exception as e:
+                logger.warning(f"⚠️ 스토리지 삭제 실패 ({len(chunk)}개): {e}")
+                self._retry_chunk(chunk)
+                continue
+            metrics.STORAGE_REAPED.inc(len(chunk), status="removed")
+            logger.info(f"🗑️ 스토리지 파일 {len(chunk)}개 삭제")
+            for content_hash in {h for _, (h, _) in chunk if h}:
+                chat_context_cache.invalidate(content_hash)
+
+    def _retry_chunk(self, chunk):
+        # 실패한 묶음은 해시별로 다시 예약 (다음 시도에서도 사용 여부를 다시 확인)
+        groups = {}
+        for path, (content_hash, attempts) in chunk:
+            paths, max_attempts = groups.get(content_hash, ([], 0))
+            paths.append(path)
+            groups[content_hash] = (paths, max(max_attempts, attempts))
+        for content_hash, (paths, attempts) in groups.items():
+            self._retry(_Task(paths, content_hash, attempts=attempts, expanded=True))
+
+    def _retry(self, task):
+        task.attempts += 1
+        if task.attempts > REAPER_MAX_RETRIES:
+            logger.error(f"❌ 스토리지 삭제 포기 ({task.attempts - 1}회 재시도): {task.paths}")
+            metrics.STORAGE_REAPED.inc(len(task.paths), status="failed")
+            return
+        delay = REAPER_RETRY_DELAY * (2 ** (task.attempts - 1))
+        with self._lock:
+            self._retrying += 1
+        timer = threading.Timer(delay, self._requeue, args=(task,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, task):
+        with self._lock:
+            self._retrying -= 1
+        self._queue.put(task)
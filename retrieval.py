@@ -0,0 +1,186 @@
+import os
+import re
+import json
+import math
+import asyncio
+import logging
+from collections import Counter
+
+import metrics
+from cache import chat_context_cache
+from gemini_client import embed, aembed
+
+logger = logging.getLogger(__name__)
+
+# 검색용 청크 크기(토큰)와 채팅 프롬프트에 넣을 청크 개수
+RETRIEVAL_CHUNK_TOKENS = int(os.environ.get("RETRIEVAL_CHUNK_TOKENS", "400"))
+CHAT_TOP_K = int(os.environ.get("CHAT_TOP_K", "6"))
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "models/text-embedding-004")
+EMBED_BATCH_SIZE = 100
+INDEX_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def index_path(content_hash):
+    # 문서 인덱스는 원본/번역본과 같은 버킷에 내용 해시로 저장
+    return f"indexes/{content_hash}.json"
+
+
+def _tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _embed(texts, task_type):
+    vectors = []
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embed(texts[i:i + EMBED_BATCH_SIZE], EMBEDDING_MODEL, task_type))
+    return vectors
+
+
+def build_index(text):
+    # 업로드 시 한 번만 실행: 청크 분할 + 임베딩 (임베딩 실패 시 BM25만 사용)
+    # summarize는 첫 업로드까지 로드를 미룸 (import_profile.LAZY_MODULES)
+    from summarize import split_into_chunks
+    chunks = split_into_chunks(text, RETRIEVAL_CHUNK_TOKENS)
+    embeddings = None
+    if chunks:
+        try:
+            embeddings = _embed(chunks, "retrieval_document")
+        except Exception as e:
+            logger.error(f"⚠️ 임베딩 생성 실패 (BM25로 대체): {e}")
+    return {"version": INDEX_VERSION, "chunks": chunks, "embeddings": embeddings}
+
+
+def save_index(supabase, bucket, content_hash, index):
+    body = json.dumps(index, ensure_ascii=False).encode("utf-8")
+    with metrics.supabase_call("storage_upload"):
+        supabase.storage.from_(bucket).upload(
+            index_path(content_hash), body,
+            file_options={"content-type": "application/json", "upsert": "true"}
+        )
+
+
+class DocumentIndex:
+    def __init__(self, chunks, embeddings=None):
+        self.chunks = chunks
+        self.embeddings = embeddings
+        # BM25 통계는 로드할 때 한 번만 계산
+        self._docs = [Counter(_tokenize(c)) for c in chunks]
+        self._lengths = [sum(d.values()) for d in self._docs]
+        self._avg_len = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0
+        df = Counter()
+        for d in self._docs:
+            df.update(d.keys())
+        n = len(chunks)
+        self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+
+    def size_bytes(self):
+        # 캐시 크기 계산용 대략치: 본문 + 임베딩(float 하나당 약 32바이트) + BM25 통계
+        text = sum(len(c.encode("utf-8")) for c in self.chunks)
+        vectors = sum(len(v) * 32 for v in self.embeddings) if self.embeddings else 0
+        terms = sum(len(d) for d in self._docs) * 100 + len(self._idf) * 100
+        return text + vectors + terms
+
+    def _bm25_scores(self, query, k1=1.5, b=0.75):
+        terms = _tokenize(query)
+        scores = []
+        for d, length in zip(self._docs, self._lengths):
+            score = 0.0
+            for t in terms:
+                tf = d.get(t)
+                if not tf:
+                    continue
+                norm = tf + k1 * (1 - b + b * length / (self._avg_len or 1))
+                score += self._idf[t] * tf * (k1 + 1) / norm
+            scores.append(score)
+        return scores
+
+    def _embedding_scores(self, q):
+        q_norm = math.sqrt(sum(x * x for x in q)) or 1.0
+        scores = []
+        for v in self.embeddings:
+            dot = sum(a * b for a, b in zip(q, v))
+            v_norm = math.sqrt(sum(x * x for x in v)) or 1.0
+            scores.append(dot / (q_norm * v_norm))
+        return scores
+
+    def search(self, query, k=CHAT_TOP_K):
+        if not self.chunks:
+            return []
+        query_vector = None
+        if self.embeddings:
+            try:
+                query_vector = _embed([query], "retrieval_query")[0]
+            except Exception as e:
+                logger.error(f"⚠️ 질문 임베딩 실패 (BM25로 대체): {e}")
+        return self.rank(query, query_vector, k)
+
+    async def asearch(self, query, k=CHAT_TOP_K):
+        # search의 비동기 버전: 질문 임베딩은 이벤트 루프에서 기다리고 점수 계산(CPU)만 스레드에서
+        if not self.chunks:
+            return []
+        query_vector = None
+        if self.embeddings:
+            try:
+                query_vector = (await aembed([query], EMBEDDING_MODEL, "retrieval_query"))[0]
+            except Exception as e:
+                logger.error(f"⚠️ 질문 임베딩 실패 (BM25로 대체): {e}")
+        return await asyncio.to_thread(self.rank, query, query_vector, k)
+
+    def rank(self, query, query_vector=None, k=CHAT_TOP_K):
+        # 질문 임베딩이 있으면 코사인 유사도, 없으면 BM25로 상위 k개 청크
+        scores = self._embedding_scores(query_vector) if query_vector is not None and self.embeddings else None
+        if scores is None:
+            scores = self._bm25_scores(query)
+            if not any(scores):
+                # 겹치는 단어가 없으면(예: 한국어 질문 + 영어 문서) 문서 앞부분 사용
+                return self.chunks[:k]
+        top = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+        # 프롬프트에서는 문서 순서대로 보여주는 편이 자연스러움
+        return [self.chunks[i] for i in sorted(top)]
+
+
+def _parse_index(raw):
+    data = json.loads(raw)
+    return DocumentIndex(data["chunks"], data.get("embeddings"))
+
+
+def _download_index(supabase, bucket, content_hash):
+    with metrics.supabase_call("storage_download"):
+        raw = supabase.storage.from_(bucket).download(index_path(content_hash))
+    return _parse_index(raw)
+
+
+async def _adownload_index(supabase, bucket, content_hash):
+    with metrics.supabase_call("storage_download"):
+        raw = await supabase.storage.from_(bucket).download(index_path(content_hash))
+    # JSON 파싱과 BM25 통계 계산은 CPU 작업이라 스레드에서
+    return await asyncio.to_thread(_parse_index, raw)
+
+
+def load_index(supabase, bucket, content_hash):
+    # 인덱스가 없는 예전 문서는 None 반환 (호출 측에서 extracted_text 사용)
+    if not content_hash:
+        return None
+    try:
+        # 같은 문서로 여러 번 채팅해도 인덱스는 한 번만 내려받음 (크기 제한 LRU + TTL)
+        return chat_context_cache.get_or_load(
+            content_hash, lambda: _download_index(supabase, bucket, content_hash)
+        )
+    except Exception as e:
+        logger.info(f"인덱스 없음 ({content_hash}): {e}")
+        return None
+
+
+async def aload_index(supabase, bucket, content_hash):
+    # load_index의 비동기 버전 (supabase는 비동기 클라이언트), 같은 캐시를 공유
+    if not content_hash:
+        return None
+    try:
+        return await chat_context_cache.aget_or_load(
+            content_hash, lambda: _adownload_index(supabase, bucket, content_hash)
+        )
+    except Exception as e:
+        logger.info(f"인덱스 없음 ({content_hash}): {e}")
+        return None
@@ -1,15 +1,18 @@
-import google.generativeai as genai
-from dotenv import load_dotenv
 import os
-from flask import jsonify
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from gemini_client import generate
 
+MODEL_NAME = 'gemini-2.5-flash-lite'
 
-def summarization(file_content):
-    load_dotenv()
-    ai_key: str = os.environ.get("GOOGLE_API_KEY")
-    genai.configure(api_key=ai_key)
-    model = genai.GenerativeModel('gemini-2.5-flash-lite')
-    prompt = f'''
+# 요약/설명을 동시에 요청할 때 쓰는 공용 스레드 풀
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("SUMMARY_WORKERS", "4")),
+                               thread_name_prefix="summarize")
+
+
+def _summary_prompt(file_content):
+    return f'''
             아래 문서를 읽고 막 챕터마다(초론, 서론 같은거) 핵심내용을 요약해줘
             반드시 보기 좋은 Markdown형식으로 출력해줘
             헤더(#), 불릿 포인트(-), 굵은 글씨(**)를 적절히 사용해서 가독성을 높여줘.
@@ -17,16 +20,10 @@ def summarization(file_content):
             {file_content}
             '알겠습니다. 문서의 핵심 내용을 Markdown 형식으로 요약해 드리겠습니다.'라는 문장은 절대 넣지마
         '''
-    response = model.generate_content(prompt)
-    return response.text
 
 
-def understand(file_content):
-    load_dotenv()
-    ai_key: str = os.environ.get("GOOGLE_API_KEY")
-    genai.configure(api_key=ai_key)
-    model = genai.GenerativeModel('gemini-2.5-flash-lite')
-    prompt = f'''
+def _understand_prompt(file_content):
+    return f'''
                 아래 문서를 읽고 이해하기 쉽도록 풀어서 설명해줘(특히 어려운 용어도 설명해주면서)
                 반드시 보기 좋은 Markdown형식으로 출력해줘
                 헤더(#), 불릿 포인트(-), 굵은 글씨(**)를 적절히 사용해서 가독성을 높여줘.
@@ -34,8 +31,170 @@ def understand(file_content):
                 내용은 다음과 같아
                 {file_content}
             '''
-    response = model.generate_content(prompt)
+
+
+def summarization(file_content):
+    response = generate(_summary_prompt(file_content), MODEL_NAME)
+    return response.text
+
+
+def understand(file_content):
+    response = generate(_understand_prompt(file_content), MODEL_NAME)
     return response.text
 
 
+def _combined(file_content):
+    # 한 번의 요청으로 요약과 설명을 JSON으로 함께 받음
+    prompt = f'''
+            아래 문서를 읽고 두 가지 결과를 JSON으로 출력해줘.
+            "summary": 챕터마다(초론, 서론 같은거) 핵심내용 요약
+            "understand": 이해하기 쉽도록 풀어서 쓴 설명(특히 어려운 용어도 설명해주면서)
+            두 값 모두 보기 좋은 Markdown형식 문자열이어야 하고
+            헤더(#), 불릿 포인트(-), 굵은 글씨(**)를 적절히 사용해서 가독성을 높여줘.
+            '알겠습니다.' 같은 문장은 절대 넣지마
+            내용은 다음과 같아
+            {file_content}
+        '''
+    response = generate(
+        prompt, MODEL_NAME,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": {
+                "type": "object",
+                "properties": {
+                    "summary": {"type": "string"},
+                    "understand": {"type": "string"},
+                },
+                "required": ["summary", "understand"],
+            },
+        },
+    )
+    data = json.loads(response.text)
+    return data["summary"], data["understand"]
+
+
+def summarize_and_understand(file_content, combined=False):
+    # (요약, 설명) 튜플 반환
+    # combined=False: 두 요청을 동시에 보냄 / combined=True: 요청 한 번으로 둘 다 받음
+    if combined:
+        return _combined(file_content)
+    summary_future = _executor.submit(summarization, file_content)
+    understand_future = _executor.submit(understand, file_content)
+    return summary_future.result(), understand_future.result()
+
+
+# ---------------------------------------------------------
+# 긴 문서용 Map-Reduce 요약
+# ---------------------------------------------------------
+# 청크 하나의 최대 토큰 수 (대략 글자수/4 로 추정)
+CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", "6000"))
+# 문서 하나를 요약할 때 쓸 수 있는 총 토큰 상한 (입력 + 예상 출력)
+MAX_SUMMARY_TOKENS = int(os.environ.get("MAX_SUMMARY_TOKENS", "200000"))
+# 청크 요약을 동시에 보낼 최대 요청 수
+MAP_CONCURRENCY = int(os.environ.get("SUMMARY_MAP_CONCURRENCY", "4"))
+# 요청 한 번의 출력 토큰 예상치 (예산 계산용)
+OUTPUT_TOKENS_ESTIMATE = 1000
+
+
+class TokenBudgetExceeded(Exception):
+    pass
+
+
+class _TokenBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def charge(self, text):
+        cost = estimate_tokens(text) + OUTPUT_TOKENS_ESTIMATE
+        with self._lock:
+            if self.spent + cost > self.limit:
+                raise TokenBudgetExceeded(f"토큰 예산 초과 ({self.spent + cost}/{self.limit})")
+            self.spent += cost
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def split_into_chunks(text, max_tokens=CHUNK_TOKENS):
+    # 문단 단위로 묶어서 청크를 만들고, 너무 긴 문단은 글자수 기준으로 자름
+    max_chars = max_tokens * 4
+    chunks = []
+    current = []
+    current_len = 0
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph[i:i + max_chars] for i in range(0, len(paragraph), max_chars)]
+        for piece in pieces:
+            if current and current_len + len(piece) > max_chars:
+                chunks.append('\n\n'.join(current))
+                current = []
+                current_len = 0
+            current.append(piece)
+            current_len += len(piece) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def _select_within_budget(chunks, budget_tokens):
+    # 예산 안에 다 못 들어가면 문서 전체에 고르게 퍼지도록 청크를 골라냄
+    per_chunk = max(estimate_tokens(c) for c in chunks) + OUTPUT_TOKENS_ESTIMATE
+    max_chunks = max(1, budget_tokens // per_chunk)
+    if len(chunks) <= max_chunks:
+        return chunks
+    step = len(chunks) / max_chunks
+    return [chunks[int(i * step)] for i in range(max_chunks)]
+
+
+def _join_partials(partials):
+    return '\n\n---\n\n'.join(partials)
+
+
+def _group_partials(partials, max_tokens):
+    # 부분 요약을 자르지 않고 통째로 묶되, 한 그룹에 최소 2개씩은 넣어서 매 단계마다 개수가 줄도록 함
+    groups = []
+    current = []
+    for partial in partials:
+        if len(current) >= 2 and estimate_tokens(_join_partials(current + [partial])) > max_tokens:
+            groups.append(current)
+            current = []
+        current.append(partial)
+    if current:
+        groups.append(current)
+    return [_join_partials(group) for group in groups]
+
+
+def summarize_document(text, max_total_tokens=MAX_SUMMARY_TOKENS, chunk_tokens=CHUNK_TOKENS,
+                       concurrency=MAP_CONCURRENCY, combined=False):
+    # 문서 전체를 (요약, 설명) 으로 만든다
+    # 1) 청크로 나눠 병렬 요약(map) 2) 부분 요약을 묶어 다시 요약(reduce)
+    # 3) 하나의 청크에 들어가면 마지막으로 요약/설명 생성
+    chunks = split_into_chunks(text, chunk_tokens)
+    if len(chunks) <= 1:
+        return summarize_and_understand(text or "내용 없음", combined=combined)
+
+    budget = _TokenBudget(max_total_tokens)
+    # 예산의 절반 정도는 map 단계에, 나머지는 reduce/최종 단계에 남겨둠
+    chunks = _select_within_budget(chunks, max_total_tokens // 2)
+
+    def summarize_chunk(chunk):
+        budget.charge(chunk)
+        return summarization(chunk)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="summary-map") as pool:
+        partials = list(pool.map(summarize_chunk, chunks))
+
+        # 부분 요약들이 청크 하나에 들어갈 때까지 계층적으로 합침
+        while len(partials) > 1 and estimate_tokens(_join_partials(partials)) > chunk_tokens:
+            partials = list(pool.map(summarize_chunk, _group_partials(partials, chunk_tokens)))
 
+    final_input = _join_partials(partials)
+    # 마지막 단계는 요약/설명 두 번 호출되므로 두 번 차감
+    budget.charge(final_input)
+    budget.charge(final_input)
+    return summarize_and_understand(final_input, combined=combined)
@@ -0,0 +1,86 @@
+import html
+from string import Template
+
+# 요약 결과(Markdown)를 HTML 문서로 만드는 템플릿
+# 예전에는 CSS를 프롬프트에 넣어 Gemini가 HTML을 만들게 했지만,
+# 이제는 Markdown만 받아서 여기서 변환하므로 CSS가 매번 입력 토큰으로 나가지 않음
+STYLE_CSS = """
+    body {
+        font-family: 'Malgun Gothic', 'Apple SD Gothic Neo', sans-serif;
+        line-height: 1.6;
+        color: #333;
+        max-width: 800px;
+        margin: 40px auto;
+        padding: 20px;
+        background-color: #f9f9f9;
+    }
+    h1 {
+        color: #2c3e50;
+        border-bottom: 2px solid #3498db;
+        padding-bottom: 10px;
+        font-size: 28px;
+    }
+    h2 {
+        color: #2980b9;
+        margin-top: 30px;
+        font-size: 22px;
+    }
+    h3 {
+        color: #16a085;
+        margin-top: 20px;
+        font-size: 18px;
+    }
+    p {
+        margin-bottom: 15px;
+        text-align: justify;
+        background-color: #fff;
+        padding: 15px;
+        border-radius: 5px;
+        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+    }
+    ul, ol {
+        background-color: #fff;
+        padding: 15px 15px 15px 40px;
+        border-radius: 5px;
+        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+    }
+    li {
+        margin-bottom: 5px;
+    }
+"""
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="ko">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>$style</style>
+</head>
+<body>
+$sections
+</body>
+</html>
+""")
+
+_markdown = None
+
+
+def _renderer():
+    # markdown-it-py는 처음 렌더링할 때 로드
+    global _markdown
+    if _markdown is None:
+        from markdown_it import MarkdownIt
+        _markdown = MarkdownIt("commonmark").enable("table")
+    return _markdown
+
+
+def markdown_to_html(text):
+    return _renderer().render(text or "")
+
+
+def render_summary_html(title, summary, understand=None):
+    # summary/understand: Gemini가 만든 Markdown
+    sections = [f"<section class=\"summary\">\n{markdown_to_html(summary)}</section>"]
+    if understand:
+        sections.append(f"<section class=\"understand\">\n{markdown_to_html(understand)}</section>")
+    return PAGE_TEMPLATE.substitute(title=html.escape(title), style=STYLE_CSS, sections="\n".join(sections))
@@ -1,18 +1,25 @@
+import os
+import sys
 import subprocess
 from dotenv import load_dotenv
-import os
-import google.generativeai as genai
+
+# 파일 하나를 pdf2zh로 번역
+#   python translate.py paper.pdf
+# 디렉터리 전체를 처리하려면 batch.py 사용 (워커 프로세스 재사용, 이어서 실행 가능)
 
 load_dotenv()  # env파일에서 환경변수 로드
 ai_key: str = os.environ.get("GOOGLE_API_KEY")
 
 model_name = 'gemini-2.5-flash-lite'
-model = genai.GenerativeModel(model_name)
 
-command = ["pdf2zh", "2407.14361v1.pdf", "-li", "en", "-lo", "ko", "-s", "google:gemini"]
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("사용법: python translate.py <pdf 파일>")
+        sys.exit(2)
 
-env = os.environ.copy()
-env["GEMINI_API_KEY"] = ai_key
-env["GEMINI_MODEL"] = model_name
-subprocess.run(command, check=True, env=env)
+    command = ["pdf2zh", sys.argv[1], "-li", "en", "-lo", "ko", "-s", "google:gemini"]
 
+    env = os.environ.copy()
+    env["GEMINI_API_KEY"] = ai_key
+    env["GEMINI_MODEL"] = model_name
+    subprocess.run(command, check=True, env=env)
@@ -0,0 +1,266 @@
+import os
+import json
+import logging
+import threading
+
+import metrics
+from translator import translation_pool, TranslationTimeout
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 번역할 페이지 수 (배치마다 체크포인트 저장)
+TRANSLATE_BATCH_PAGES = int(os.environ.get("TRANSLATE_BATCH_PAGES", "10"))
+# 배치 하나가 실패했을 때 재시도 횟수
+TRANSLATE_BATCH_RETRIES = int(os.environ.get("TRANSLATE_BATCH_RETRIES", "1"))
+# 같은 문서를 다른 작업이 번역 중일 때 끝나기를 기다리는 최대 시간(초)
+TRANSLATE_WAIT_TIMEOUT = int(os.environ.get("TRANSLATE_WAIT_TIMEOUT", "3600"))
+
+# 같은 문서를 두 작업이 동시에 번역하지 않도록 진행 중인 해시 기록
+_active = set()
+_active_lock = threading.Lock()
+_active_done = threading.Condition(_active_lock)
+
+
+class TranslationInProgress(Exception):
+    pass
+
+
+def is_translating(content_hash):
+    # 이 프로세스에서 번역 중인 문서인지 (진행 중 표시)
+    with _active_lock:
+        return content_hash in _active
+
+
+def wait_for_translation(content_hash, timeout=None):
+    # 다른 작업의 번역이 끝날 때까지 대기 (시간 안에 끝나면 True)
+    with _active_done:
+        return _active_done.wait_for(lambda: content_hash not in _active, timeout)
+
+
+def final_path(content_hash):
+    return f"translated/{content_hash}.pdf"
+
+
+def manifest_path(content_hash):
+    return f"translated/{content_hash}/manifest.json"
+
+
+def batch_path(content_hash, start, end):
+    # 페이지 번호는 1부터, 파일명에는 포함 범위로 표시
+    return f"translated/{content_hash}/pages_{start + 1:04d}-{end:04d}.pdf"
+
+
+def storage_paths(supabase, bucket, content_hash):
+    # 삭제용: 배치 번역본들과 진행 상황 파일 경로
+    manifest = TranslationManifest.load(supabase, bucket, content_hash)
+    return [path for _, _, path in manifest.done_batches()] + [manifest_path(content_hash)]
+
+
+def _page_ranges(spec):
+    # "1-3,7" -> [(1, 3), (7, 7)], 형식이 틀리면 ValueError
+    ranges = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+        else:
+            start = end = int(part)
+        if start < 1 or end < start:
+            raise ValueError(f"잘못된 페이지 범위: {part}")
+        ranges.append((start, end))
+    return ranges
+
+
+def validate_page_ranges(spec):
+    # 요청을 받을 때 형식만 미리 검사 (페이지 수는 번역 시작 때 알 수 있음)
+    if spec and not _page_ranges(spec):
+        raise ValueError(f"잘못된 페이지 범위: {spec}")
+
+
+def parse_page_ranges(spec, total_pages):
+    # "1-3,7" -> [0, 1, 2, 6] (0부터 시작하는 페이지 번호)
+    pages = []
+    if not spec:
+        return pages
+    for start, end in _page_ranges(spec):
+        for page in range(start, min(end, total_pages) + 1):
+            if page - 1 not in pages:
+                pages.append(page - 1)
+    return pages
+
+
+def make_batches(total_pages, batch_pages=TRANSLATE_BATCH_PAGES, priority_pages=None):
+    # (start, end) 배치 목록. 요청된 페이지가 포함된 배치를 앞으로 보냄
+    batches = [(s, min(s + batch_pages, total_pages)) for s in range(0, total_pages, batch_pages)]
+    if priority_pages:
+        first = [b for b in batches if any(b[0] <= p < b[1] for p in priority_pages)]
+        batches = first + [b for b in batches if b not in first]
+    return batches
+
+
+def _is_not_found(error):
+    # Storage에 객체가 없을 때의 오류인지 (storage3는 상태 코드를 args[0] dict에 담음)
+    detail = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+    if str(detail.get("statusCode", "")) == "404" or detail.get("error") == "not_found":
+        return True
+    return "not found" in str(error).lower()
+
+
+class TranslationManifest:
+    # Storage에 저장되는 진행 상황 (작업이 죽어도 다음 실행에서 이어서 번역)
+    def __init__(self, supabase, bucket, content_hash, data=None):
+        self.supabase = supabase
+        self.bucket = bucket
+        self.content_hash = content_hash
+        self.data = data or {"pages": 0, "batch_pages": TRANSLATE_BATCH_PAGES, "done": {}, "completed": False}
+
+    @classmethod
+    def load(cls, supabase, bucket, content_hash):
+        # 아직 번역을 시작하지 않은 경우(객체 없음)만 빈 진행 상황으로 시작하고,
+        # 그 밖의 오류는 그대로 올림 (빈 것으로 보면 재개가 1페이지부터 다시 하고
+        # 스토리지 정리가 배치 번역본 경로를 모른 채 manifest만 지우게 됨)
+        try:
+            with metrics.supabase_call("storage_download"):
+                raw = supabase.storage.from_(bucket).download(manifest_path(content_hash))
+        except Exception as e:
+            if _is_not_found(e):
+                return cls(supabase, bucket, content_hash)
+            raise
+        return cls(supabase, bucket, content_hash, json.loads(raw))
+
+    def save(self):
+        with metrics.supabase_call("storage_upload"):
+            self.supabase.storage.from_(self.bucket).upload(
+                manifest_path(self.content_hash), json.dumps(self.data).encode("utf-8"),
+                file_options={"content-type": "application/json", "upsert": "true"}
+            )
+
+    def is_done(self, start, end):
+        return f"{start}-{end}" in self.data["done"]
+
+    def mark_done(self, start, end, path):
+        self.data["done"][f"{start}-{end}"] = path
+        self.save()
+
+    def done_batches(self):
+        batches = []
+        for key, path in self.data["done"].items():
+            start, end = (int(x) for x in key.split('-'))
+            batches.append((start, end, path))
+        return sorted(batches)
+
+    def translated_pages(self):
+        return sum(end - start for start, end, _ in self.done_batches())
+
+
+def _split_pdf(source_path, start, end, output_path):
+    import fitz
+    with fitz.open(source_path) as src, fitz.open() as part:
+        part.insert_pdf(src, from_page=start, to_page=end - 1)
+        part.save(output_path)
+
+
+def _merge_pdfs(paths, output_path):
+    import fitz
+    with fitz.open() as merged:
+        for path in paths:
+            with fitz.open(path) as part:
+                merged.insert_pdf(part)
+        merged.save(output_path)
+
+
+def _upload(supabase, bucket, path, local_path):
+    with open(local_path, "rb") as f, metrics.supabase_call("storage_upload"):
+        supabase.storage.from_(bucket).upload(
+            path, f, file_options={"content-type": "application/pdf", "upsert": "true"}
+        )
+
+
+def translate_progressively(supabase, bucket, content_hash, source_path, work_dir,
+                            lang_in, lang_out, prompt_text, priority_pages=None, on_batch=None):
+    # 페이지 배치 단위로 번역하고, 배치가 끝날 때마다 Storage에 올리고 체크포인트 저장
+    # 모든 배치가 끝나면 하나의 PDF로 합쳐 final_path에 올리고 그 public URL 반환
+    # 일부만 끝났으면 None 반환 (다음 실행에서 남은 배치부터 이어서 진행)
+    with _active_lock:
+        if content_hash in _active:
+            raise TranslationInProgress("이미 번역 중인 문서입니다.")
+        _active.add(content_hash)
+    try:
+        import fitz
+        with fitz.open(source_path) as doc:
+            total_pages = doc.page_count
+
+        manifest = TranslationManifest.load(supabase, bucket, content_hash)
+        if manifest.data["completed"]:
+            return supabase.storage.from_(bucket).get_public_url(final_path(content_hash))
+        manifest.data["pages"] = total_pages
+        batch_pages = manifest.data.get("batch_pages") or TRANSLATE_BATCH_PAGES
+
+        failed = False
+        local_mono = {}
+        for start, end in make_batches(total_pages, batch_pages, priority_pages):
+            if manifest.is_done(start, end):
+                continue
+            part_path = os.path.join(work_dir, f"part_{start + 1:04d}-{end:04d}.pdf")
+            _split_pdf(source_path, start, end, part_path)
+
+            mono_path = None
+            for attempt in range(TRANSLATE_BATCH_RETRIES + 1):
+                try:
+                    mono_path = translation_pool.translate(
+                        part_path, work_dir, lang_in=lang_in, lang_out=lang_out, prompt_text=prompt_text
+                    )
+                    break
+                except TranslationTimeout:
+                    metrics.TRANSLATION_TIMEOUTS.inc()
+                    logger.error(f"⏰ 번역 배치 시간 초과 ({start + 1}-{end}쪽, 시도 {attempt + 1})")
+                except Exception as e:
+                    logger.error(f"⚠️ 번역 배치 실패 ({start + 1}-{end}쪽, 시도 {attempt + 1}): {e}")
+            if mono_path is None:
+                failed = True
+                continue
+
+            path = batch_path(content_hash, start, end)
+            _upload(supabase, bucket, path, mono_path)
+            manifest.mark_done(start, end, path)
+            local_mono[(start, end)] = mono_path
+            logger.info(f"✅ 번역 배치 완료: {start + 1}-{end}쪽 ({manifest.translated_pages()}/{total_pages})")
+            if on_batch:
+                on_batch(manifest.translated_pages(), total_pages)
+
+        if failed:
+            return None
+
+        # 모든 배치 완료: 이번 실행에서 번역하지 않은 배치는 Storage에서 받아서 합침
+        local_parts = []
+        for start, end, path in manifest.done_batches():
+            local_path = local_mono.get((start, end))
+            if local_path is None:
+                local_path = os.path.join(work_dir, f"mono_{start + 1:04d}-{end:04d}.pdf")
+                with open(local_path, "wb") as f, metrics.supabase_call("storage_download"):
+                    f.write(supabase.storage.from_(bucket).download(path))
+            local_parts.append(local_path)
+        merged_path = os.path.join(work_dir, "merged.pdf")
+        _merge_pdfs(local_parts, merged_path)
+        _upload(supabase, bucket, final_path(content_hash), merged_path)
+
+        manifest.data["completed"] = True
+        manifest.save()
+        return supabase.storage.from_(bucket).get_public_url(final_path(content_hash))
+    finally:
+        with _active_done:
+            _active.discard(content_hash)
+            _active_done.notify_all()
+
+
+def batch_urls(supabase, bucket, content_hash):
+    # 지금까지 번역된 배치들의 (시작 페이지, 끝 페이지, URL) 목록
+    manifest = TranslationManifest.load(supabase, bucket, content_hash)
+    storage = supabase.storage.from_(bucket)
+    return manifest, [
+        {"start_page": start + 1, "end_page": end, "url": storage.get_public_url(path)}
+        for start, end, path in manifest.done_batches()
+    ]
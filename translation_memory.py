@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 번역 메모리 DB 위치와 최대 보관 문장 수
+TM_PATH = os.environ.get("TRANSLATION_MEMORY_PATH", os.path.join(os.getcwd(), "translation_memory.db"))
+TM_MAX_ENTRIES = int(os.environ.get("TRANSLATION_MEMORY_MAX_ENTRIES", "200000"))
+# 통계/사용 시각 기록/정리 작업을 몇 번의 호출마다 할지
+_FLUSH_EVERY = 100
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+create table if not exists tm (
+    key text primary key,
+    target text not null,
+    last_used real not null
+);
+create index if not exists tm_last_used_idx on tm (last_used);
+create table if not exists tm_stats (
+    name text primary key,
+    value integer not null
+);
+"""
+
+
+def normalize(text):
+    # 공백/줄바꿈 차이만 있는 문장은 같은 문장으로 취급
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class TranslationMemory:
+    # 문장(세그먼트) 단위 번역 캐시
+    # 키: (정규화된 원문, 원본 언어, 대상 언어, 프롬프트, 번역 서비스)
+    # 여러 번역 워커 프로세스가 같은 SQLite 파일을 공유함
+    def __init__(self, path=TM_PATH, max_entries=TM_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {"hits": 0, "misses": 0}
+        # 적중한 키의 마지막 사용 시각 (적중마다 쓰지 않고 통계와 함께 모아서 기록)
+        self._touched = {}
+        self._ops = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute("pragma synchronous=normal")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(text, lang_in, lang_out, prompt, service=""):
+        h = hashlib.sha256()
+        for part in (normalize(text), lang_in or "", lang_out or "", prompt or "", service or ""):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute("select target from tm where key = ?", (key,)).fetchone()
+        self._count("hits" if row is not None else "misses", key if row is not None else None)
+        return row[0] if row is not None else None
+
+    def put(self, key, target):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "insert or replace into tm (key, target, last_used) values (?, ?, ?)",
+                (key, target, time.time()),
+            )
+
+    def _count(self, name, touched_key=None):
+        with self._lock:
+            self._pending[name] += 1
+            if touched_key is not None:
+                self._touched[touched_key] = time.time()
+            self._ops += 1
+            if self._ops < _FLUSH_EVERY:
+                return
+            pending, touched = self._take()
+        self._flush(pending, touched)
+        self.evict()
+
+    def _take(self):
+        # self._lock 안에서 호출
+        pending, touched = self._pending, self._touched
+        self._pending = {"hits": 0, "misses": 0}
+        self._touched = {}
+        self._ops = 0
+        return pending, touched
+
+    def _flush(self, pending, touched):
+        conn = self._connect()
+        with conn:
+            if touched:
+                conn.executemany("update tm set last_used = ? where key = ?",
+                                 [(used, key) for key, used in touched.items()])
+            for name, value in pending.items():
+                if value:
+                    conn.execute(
+                        "insert into tm_stats (name, value) values (?, ?) "
+                        "on conflict(name) do update set value = value + excluded.value",
+                        (name, value),
+                    )
+
+    def flush(self):
+        with self._lock:
+            pending, touched = self._take()
+        self._flush(pending, touched)
+
+    def evict(self):
+        # 최대 개수를 넘으면 가장 오래 쓰지 않은 문장부터 10% 여유가 생길 때까지 삭제
+        conn = self._connect()
+        count = conn.execute("select count(*) from tm").fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        remove = count - int(self.max_entries * 0.9)
+        with conn:
+            conn.execute(
+                "delete from tm where key in (select key from tm order by last_used limit ?)", (remove,)
+            )
+        logger.info(f"🧹 번역 메모리 정리: {remove}개 삭제")
+        return remove
+
+    def stats(self):
+        conn = self._connect()
+        entries = conn.execute("select count(*) from tm").fetchone()[0]
+        values = dict(conn.execute("select name, value from tm_stats").fetchall())
+        with self._lock:
+            hits = values.get("hits", 0) + self._pending["hits"]
+            misses = values.get("misses", 0) + self._pending["misses"]
+        total = hits + misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
+
+
+def install(translator_cls, tm, get_prompt):
+    # pdf2zh 번역기의 translate()를 감싸서 모델 호출 전에 번역 메모리를 먼저 확인
+    # 이 메모리가 기준 캐시이므로 번역은 ignore_cache=True로 실행해 pdf2zh 캐시에 중복 저장하지 않음
+    original = translator_cls.translate
+    if getattr(original, "_tm_wrapped", False):
+        return
+
+    def translate(self, text, *args, **kwargs):
+        key = tm.make_key(text, getattr(self, "lang_in", ""), getattr(self, "lang_out", ""),
+                          get_prompt(), getattr(self, "name", ""))
+        cached = tm.get(key)
+        if cached is not None:
+            return cached
+        result = original(self, text, *args, **kwargs)
+        if result:
+            tm.put(key, result)
+        return result
+
+    translate._tm_wrapped = True
+    translator_cls.translate = translate
@@ -0,0 +1,220 @@
+import os
+import shutil
+import tempfile
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# 번역 워커 프로세스 수 (pdf2zh 모델을 각자 한 번씩만 로드)
+TRANSLATE_WORKERS = int(os.environ.get("TRANSLATE_WORKERS", "1"))
+# 워커 하나가 처리할 최대 작업 수 (0이면 재시작 없음, 메모리 누수 대비용)
+TRANSLATE_MAX_TASKS_PER_WORKER = int(os.environ.get("TRANSLATE_MAX_TASKS_PER_WORKER", "0"))
+# 워커 내부에서 pdf2zh가 사용할 스레드 수
+TRANSLATE_THREADS = int(os.environ.get("TRANSLATE_THREADS", "1"))
+TRANSLATE_SERVICE = os.environ.get("TRANSLATE_SERVICE", "google:gemini")
+# 워커가 작업을 실제로 시작한 때부터 재는 번역 제한 시간(초) (워커를 기다린 시간은 포함하지 않음)
+TRANSLATE_TIMEOUT = int(os.environ.get("TRANSLATE_TIMEOUT", "120"))
+# 시간 초과 후 취소 신호에 반응하기를 기다리는 시간(초), 지나면 워커를 강제 종료
+# (pdf2zh는 페이지 사이에서만 취소를 확인하므로 한 페이지/네트워크 호출에서 멈추면 반응하지 않음)
+TRANSLATE_CANCEL_GRACE = float(os.environ.get("TRANSLATE_CANCEL_GRACE", "10"))
+# 문장 단위 번역 메모리 사용 여부
+# 켜져 있으면 translation_memory가 유일한 문장 캐시 (키에 이 앱의 프롬프트 포함)
+# pdf2zh 자체 캐시(pdf2zh.cache.TranslationCache)는 ignore_cache로 끄고, 꺼져 있을 때만 pdf2zh 캐시를 씀
+TRANSLATION_MEMORY_ENABLED = os.environ.get("TRANSLATION_MEMORY", "1") == "1"
+
+
+class TranslationTimeout(Exception):
+    pass
+
+
+# ---------------------------------------------------------
+# 워커 프로세스 쪽 코드 (spawn된 프로세스 안에서만 실행)
+# ---------------------------------------------------------
+_worker_model = None
+_worker_tm = None
+_current_prompt = None
+
+
+def _init_worker():
+    # 프로세스 시작 시 한 번만 pdf2zh와 레이아웃 모델을 로드해 둔다
+    global _worker_model, _worker_tm
+    from pdf2zh.doclayout import ModelInstance, OnnxModel
+
+    if ModelInstance.value is None:
+        ModelInstance.value = OnnxModel.load_available()
+    _worker_model = ModelInstance.value
+
+    if TRANSLATION_MEMORY_ENABLED:
+        from pdf2zh.translator import BaseTranslator
+        from translation_memory import TranslationMemory, install
+
+        _worker_tm = TranslationMemory()
+        install(BaseTranslator, _worker_tm, lambda: _current_prompt)
+
+    # Gemini 번역기라면 웹 프로세스와 같은 속도 제한/재시도 규칙 적용
+    import pdf2zh.translator as pdf2zh_translator
+    gemini_translator = getattr(pdf2zh_translator, "GeminiTranslator", None)
+    if gemini_translator is not None:
+        from gemini_client import install_translator_limits
+        install_translator_limits(gemini_translator, share=TRANSLATE_WORKERS)
+    logger.info(f"🔥 번역 워커 준비 완료 (pid={os.getpid()})")
+
+
+def _warm():
+    return os.getpid()
+
+
+def _translate_in_worker(input_path, output_dir, lang_in, lang_out, service, prompt_text,
+                         threads, cancel_event, started_event):
+    # 웹 프로세스는 이 신호를 받은 뒤부터 제한 시간을 잰다
+    started_event.set()
+    from string import Template
+    from pdf2zh.high_level import translate
+
+    # 워커는 한 번에 작업 하나만 처리하므로 현재 프롬프트를 전역으로 둬도 안전
+    global _current_prompt
+    _current_prompt = prompt_text
+    prompt = Template(prompt_text) if prompt_text else None
+    try:
+        result = translate(
+            files=[input_path],
+            output=output_dir,
+            lang_in=lang_in,
+            lang_out=lang_out,
+            service=service,
+            thread=threads,
+            model=_worker_model,
+            prompt=prompt,
+            cancellation_event=cancel_event,
+            ignore_cache=_worker_tm is not None,
+            envs={"GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "")},
+        )
+    finally:
+        if _worker_tm is not None:
+            _worker_tm.flush()
+    mono_path, _dual_path = result[0]
+    return mono_path
+
+
+# ---------------------------------------------------------
+# 웹 프로세스 쪽 코드
+# ---------------------------------------------------------
+class TranslationPool:
+    def __init__(self, workers=TRANSLATE_WORKERS):
+        self.workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self._executor = None
+        self._manager = None
+        self._lock = threading.Lock()
+        # 워커 수만큼만 작업을 넘김 (풀 안에서 앞 작업을 기다리다 시간 초과되어
+        # 멀쩡히 진행 중인 작업까지 강제 종료하지 않도록, 대기는 여기서 함)
+        self._slots = threading.BoundedSemaphore(workers)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                kwargs = {}
+                if TRANSLATE_MAX_TASKS_PER_WORKER > 0:
+                    kwargs["max_tasks_per_child"] = TRANSLATE_MAX_TASKS_PER_WORKER
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=self._ctx,
+                    initializer=_init_worker, **kwargs
+                )
+                self._manager = self._ctx.Manager()
+            return self._executor
+
+    def _reset(self):
+        # 워커가 죽으면(OOM 등) 풀을 버리고 다음 요청에서 새로 만든다
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _kill(self, executor):
+        # 멈춘 워커를 강제 종료하고 풀을 버림 (다음 요청에서 새로 만듦)
+        # 같은 풀에서 진행 중이던 다른 작업은 BrokenProcessPool로 실패하고 배치 재시도로 넘어감
+        with self._lock:
+            if self._executor is not executor:
+                return  # 다른 스레드가 이미 교체함
+            self._executor = None
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.error(f"🔪 응답 없는 번역 워커 {len(processes)}개 강제 종료, 풀 재생성 예정")
+
+    def is_warm(self):
+        # 워커 프로세스가 이미 떠 있는지 (모델 메모리가 이미 RSS에 잡혀 있음)
+        with self._lock:
+            if self._executor is None:
+                return False
+            processes = getattr(self._executor, "_processes", None) or {}
+            return any(p.is_alive() for p in processes.values())
+
+    def warm_up(self):
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(_warm)
+
+    def make_output_dir(self, base_dir, job_key):
+        # 작업마다 독립된 출력 디렉터리를 써서 동시 작업끼리 파일이 섞이지 않게 함
+        return tempfile.mkdtemp(prefix=f"job_{job_key}_", dir=base_dir)
+
+    def translate(self, input_path, output_dir, lang_in="en", lang_out="ko", prompt_text=None,
+                  service=TRANSLATE_SERVICE, timeout=TRANSLATE_TIMEOUT):
+        self._slots.acquire()
+        try:
+            executor = self._get_executor()
+            cancel_event = self._manager.Event()
+            started_event = self._manager.Event()
+            future = executor.submit(
+                _translate_in_worker, input_path, output_dir, lang_in, lang_out,
+                service, prompt_text, TRANSLATE_THREADS, cancel_event, started_event
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        # 풀이 강제 종료되어도 future는 끝나므로 자리는 항상 반환됨
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            # 워커 기동(모델 로드)과 작업 시작까지는 제한 시간에 넣지 않음
+            while not future.done() and not started_event.wait(1):
+                pass
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 먼저 진행 중인 번역만 취소하고, 유예 시간 안에 끝나지 않으면 워커를 강제 종료
+            cancel_event.set()
+            try:
+                future.result(timeout=TRANSLATE_CANCEL_GRACE)
+            except FutureTimeoutError:
+                self._kill(executor)
+            except Exception:
+                pass
+            raise TranslationTimeout(f"번역 시간 초과 ({timeout}s)")
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+
+
+def remove_output_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+translation_pool = TranslationPool()